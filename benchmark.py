@@ -0,0 +1,304 @@
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import telebot
+
+import tgbot
+import utils
+
+CRAFT_RESPONSES = {
+    '/api/v1/ping': {'response': 'pong'},
+    '/api/v1/api': {
+        'name': 'WebCraftAPI',
+        'version': '1.0.0',
+        'description': 'benchmark',
+        'author': 'benchmark',
+        'releaseDate': '2024-01-01',
+        'website': 'https://example.com',
+        'documentation': 'https://example.com/docs'
+    },
+    '/api/v1/server': {
+        'serverName': 'Paper',
+        'serverVersion': '1.20.4',
+        'serverBukkitVersion': '1.20.4-R0.1',
+        'serverIP': '',
+        'serverPort': 25565,
+        'serverMotd': 'benchmark',
+        'running': True
+    },
+    '/api/v1/players/online': {'onlinePlayers': 2, 'online': ['Alex', 'Steve']},
+    '/api/v1/worlds': {'worldCount': 2, 'worlds': ['world', 'world_nether']},
+    '/api/v1/banlist/players': {'bannedPlayers': 1, 'players': ['Griefer']},
+}
+
+WORLD_RESPONSE = {
+    'allowAnimals': True,
+    'allowMonsters': True,
+    'difficulty': 'NORMAL',
+    'gameTime': 100,
+    'pvp': True,
+    'spawnX': 0,
+    'spawnY': 64,
+    'spawnZ': 0,
+    'time': 1000,
+    'seed': 42
+}
+
+SYNTHETIC_COMMANDS = [
+    '/debug',
+    '/2048 start',
+    '/up',
+    '/left',
+    '/craft',
+    '/craft help',
+    '/craft ping',
+    '/craft server',
+    '/craft onlineplayers',
+    '/craft banlist',
+]
+
+SYNTHETIC_EVENTS = [
+    'DEBUG whoami',
+    'DEBUG whereami',
+    'CRAFT help',
+    'CRAFT api',
+    'CRAFT server',
+    'CRAFT onlineplayers',
+    'CRAFT world',
+    'CRAFT worldinfo world',
+]
+
+
+class FakeCraftServer:
+    def __init__(self, latency: float = 0):
+        self.latency = latency
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self.handler_class())
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='fake-craft', daemon=True)
+
+    @property
+    def hostname(self) -> str:
+        return f'http://127.0.0.1:{self.httpd.server_address[1]}'
+
+    def handler_class(self):
+        server = self
+
+        class CraftHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if self.path in CRAFT_RESPONSES:
+                    self.reply(200, CRAFT_RESPONSES[self.path])
+                elif self.path.startswith('/api/v1/worlds/'):
+                    self.reply(200, {'name': self.path[len('/api/v1/worlds/'):], **WORLD_RESPONSE})
+                else:
+                    self.reply(404, {})
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                self.reply(202, {'success': True, 'code': 202, 'message': 'ok'})
+
+            def reply(self, status: int, body: dict):
+                if server.latency > 0:
+                    time.sleep(server.latency)
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return CraftHandler
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class StubTeleBot:
+    def __init__(self, token: str, *args, **kwargs):
+        self.token = token
+        self.command_handlers = []
+        self.callback_handlers = []
+        self.sent = 0
+
+    def message_handler(self, commands: list[str] | None = None, **kwargs):
+        def decorator(handler):
+            self.command_handlers.append((set(commands or []), handler))
+            return handler
+
+        return decorator
+
+    def callback_query_handler(self, func, **kwargs):
+        def decorator(handler):
+            self.callback_handlers.append((func, handler))
+            return handler
+
+        return decorator
+
+    def process_new_updates(self, updates: list[telebot.types.Update]):
+        for update in updates:
+            if update.message is not None:
+                command = telebot.util.extract_command(update.message.text)
+                for commands, handler in self.command_handlers:
+                    if command in commands:
+                        handler(update.message)
+                        break
+            elif update.callback_query is not None:
+                for func, handler in self.callback_handlers:
+                    if func(update.callback_query):
+                        handler(update.callback_query)
+                        break
+
+    def get_me(self):
+        return telebot.types.User(0, True, 'benchmark', username='SakulinBenchmarkBot')
+
+    def reply_to(self, message, text, **kwargs):
+        self.sent += 1
+
+    def edit_message_text(self, text, chat_id, message_id, **kwargs):
+        self.sent += 1
+
+    def infinity_polling(self, *args, **kwargs):
+        pass
+
+
+def synthetic_updates(count: int, seed: int, event_ratio: float = 0.6) -> list[dict]:
+    rng = random.Random(seed)
+    chats = [{'id': 1000 + i, 'type': 'private'} for i in range(20)] + \
+            [{'id': -1000 - i, 'type': 'supergroup', 'title': f'group {i}'} for i in range(5)]
+    updates = []
+    for update_id in range(count):
+        chat = rng.choice(chats)
+        user = {'id': chat['id'] if chat['id'] > 0 else rng.randint(1, 200), 'is_bot': False, 'first_name': 'user'}
+        if rng.random() < event_ratio:
+            updates.append({
+                'update_id': update_id,
+                'callback_query': {
+                    'id': str(update_id),
+                    'chat_instance': str(chat['id']),
+                    'from': user,
+                    'data': rng.choice(SYNTHETIC_EVENTS),
+                    'message': {'message_id': update_id, 'date': 0, 'chat': chat, 'text': 'menu'}
+                }
+            })
+        else:
+            updates.append({
+                'update_id': update_id,
+                'message': {
+                    'message_id': update_id,
+                    'date': 0,
+                    'chat': chat,
+                    'from': user,
+                    'text': rng.choice(SYNTHETIC_COMMANDS)
+                }
+            })
+    return updates
+
+
+def recorded_updates(path: str) -> list[dict]:
+    with open(path, 'r', encoding='utf-8') as record_file:
+        return [json.loads(line) for line in record_file if line.strip() != '']
+
+
+def percentile(samples: list[float], ratio: float) -> float:
+    if len(samples) == 0:
+        return 0
+    return samples[min(len(samples) - 1, int(ratio * len(samples)))]
+
+
+def report(title: str, samples: list[float], elapsed: float):
+    samples = sorted(samples)
+    print('{:<12} n={:<7} {:>10.1f}/s  p50={:.3f}ms  p90={:.3f}ms  p99={:.3f}ms  max={:.3f}ms'.format(
+        title,
+        len(samples),
+        len(samples) / elapsed if elapsed > 0 else 0,
+        percentile(samples, 0.5) * 1000,
+        percentile(samples, 0.9) * 1000,
+        percentile(samples, 0.99) * 1000,
+        (samples[-1] if len(samples) > 0 else 0) * 1000
+    ))
+
+
+def build_features(craft_hostname: str) -> list[tgbot.IFeature]:
+    from feature2048 import _2048Feature
+    from featuredebug import DebugFeature
+    from featurewebcraftapi import WebCraftAPIFeature
+
+    return [
+        DebugFeature(),
+        WebCraftAPIFeature(craft_hostname, 'benchmark', https=False, storage_backend=utils.MemoryStorageBackend()),
+        _2048Feature()
+    ]
+
+
+def replay(builder: tgbot.BotBuilder, bot: StubTeleBot, updates: list[telebot.types.Update], through_handlers: bool):
+    samples = {'command': [], 'event': []}
+    started = time.perf_counter()
+    for update in updates:
+        kind = 'command' if update.message is not None else 'event'
+        update_started = time.perf_counter()
+        if through_handlers:
+            bot.process_new_updates([update])
+        elif kind == 'command':
+            builder.route_command(update.message)
+        else:
+            builder.route_event(update.callback_query)
+        samples[kind].append(time.perf_counter() - update_started)
+    return samples, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay update streams through the routing pipeline')
+    parser.add_argument('--updates', type=int, default=2000, help='number of synthetic updates')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--replay', help='JSON lines file of recorded Telegram updates')
+    parser.add_argument('--craft-latency', type=float, default=0, help='seconds of latency added by the fake craft API')
+    parser.add_argument('--handlers', action='store_true', help='replay through the registered bot handlers')
+    parser.add_argument('--verbose', action='store_true', help='keep feature output during the replay')
+    args = parser.parse_args()
+
+    if args.replay is None:
+        raw_updates = synthetic_updates(args.updates, args.seed)
+    else:
+        raw_updates = recorded_updates(args.replay)
+    updates = [telebot.types.Update.de_json(raw_update) for raw_update in raw_updates]
+
+    craft_server = FakeCraftServer(args.craft_latency).start()
+    try:
+        bot = StubTeleBot('benchmark')
+        with mock.patch.object(tgbot.telebot, 'TeleBot', lambda *_, **__: bot):
+            builder = tgbot.build_bot(
+                build_features(craft_server.hostname),
+                {'type': 'telegram', 'token': 'benchmark'}
+            )
+
+        print('\n* 开始回放 *')
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+            samples, elapsed = replay(builder, bot, updates, args.handlers)
+        report('command', samples['command'], sum(samples['command']))
+        report('event', samples['event'], sum(samples['event']))
+        report('total', samples['command'] + samples['event'], elapsed)
+        for feature in builder.feature_list:
+            feature.close()
+    finally:
+        craft_server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
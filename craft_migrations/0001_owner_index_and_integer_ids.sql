@@ -0,0 +1,16 @@
+create index if not exists authentication_code_owner_id on authentication_code (owner_id);
+
+create table try_apply_record_migrated
+(
+    id          integer not null,
+    apply_times integer not null default 1,
+    primary key (id)
+);
+
+insert into try_apply_record_migrated (id, apply_times)
+select cast(id as integer), coalesce(apply_times, 1)
+from try_apply_record;
+
+drop table try_apply_record;
+
+alter table try_apply_record_migrated rename to try_apply_record;
@@ -0,0 +1,5 @@
+create table craft_subscription
+(
+    chat_id integer not null,
+    primary key (chat_id)
+);
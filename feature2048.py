@@ -152,14 +152,14 @@ class _2048Feature(tgbot.IFeature):
         return key in self.board_map
 
     def handle_command(self, model):
-        command = model.text[1:]
+        context = tgbot.command_context(model)
         if self.is_playing(model.chat.id):
-            if is_direction(command):
-                self.board_map[model.chat.id].move(command)
+            if is_direction(context.command):
+                self.board_map[model.chat.id].move(context.command)
                 return msg_view(self.board_map[model.chat.id].status())
 
-        match command:
-            case '2048 start':
+        match context.command, context.tail:
+            case '2048', 'start':
                 self.board_map[model.chat.id] = _2048Board()
                 return msg_view(self.board_map[model.chat.id].status())
 
@@ -9,7 +9,7 @@ class DebugFeature(tgbot.IFeature):
     def __init__(self):
         super().__init__()
         print('正在部署菜单')
-        self.menu_reply = tgbot.MsgReply(
+        self.menu_reply = tgbot.FrozenMsgReply(
             '欢迎访问 Debug 功能',
             [
                 tgbot.EventKeyboard(
@@ -22,6 +22,15 @@ class DebugFeature(tgbot.IFeature):
                 ),
             ]
         )
+        self.back_to_menu_reply = tgbot.FrozenMsgReply(
+            '',
+            [
+                tgbot.EventKeyboard(
+                    '返回菜单',
+                    'DEBUG menu'
+                )
+            ]
+        )
 
     def handle_command(self, model) -> MsgReply | str | None:
         content = tgbot.separate_command_and_content(model, 'debug')
@@ -63,16 +72,11 @@ class DebugFeature(tgbot.IFeature):
             res = self.event_router(call, content)
             if res is None:
                 return self.menu_reply
-            return tgbot.MsgReply(
-                res,
-                [
-                    tgbot.EventKeyboard(
-                        '返回菜单',
-                        'DEBUG menu'
-                    )
-                ]
-            )
+            return self.back_to_menu_reply.with_msg(res)
         return None
 
     def register_commands(self) -> list[str]:
         return ['debug']
+
+    def register_events(self) -> list[str]:
+        return ['DEBUG']
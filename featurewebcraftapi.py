@@ -1,17 +1,32 @@
 import inspect
 import json
-import shlex
+import os
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable
 
 import requests
+import requests.adapters
 import telebot.types
+import urllib3.exceptions
+from urllib3.util.retry import Retry
 
 import tgbot
+import tgmetrics
 import utils
 from tgbot import MsgReply
 
 
+def is_timeout(error: requests.exceptions.ConnectionError) -> bool:
+    reason = error.args[0] if len(error.args) > 0 else None
+    if isinstance(reason, urllib3.exceptions.MaxRetryError):
+        reason = reason.reason
+    return isinstance(reason, urllib3.exceptions.TimeoutError) and \
+        not isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+
 class Ability:
     def __init__(
             self,
@@ -32,9 +47,52 @@ class Ability:
         self.show_back_to_help = show_back_to_help
 
 
+class AbilityEntry:
+    def __init__(self, name: str, ability: Ability, help_keyboard: tgbot.EventKeyboard):
+        parameters = inspect.signature(ability.func).parameters.values()
+        self.ability = ability
+        self.variadic = any(parameter.kind == inspect.Parameter.VAR_POSITIONAL for parameter in parameters)
+        self.arity = len(parameters) - 1 - self.variadic
+        self.group_error = tgbot.FrozenMsgReply(f'命令 {name} 无法在群组中使用', [help_keyboard])
+        self.private_error = tgbot.FrozenMsgReply(f'命令 {name} 无法在私聊中使用', [help_keyboard])
+        if self.variadic:
+            self.arity_error = f'命令 {name} 需要接收至少 {self.arity + 1} 个参数'
+        else:
+            self.arity_error = f'命令 {name} 需要接收 {self.arity} 个参数'
+
+    def accepts(self, argc: int) -> bool:
+        return argc > self.arity if self.variadic else argc == self.arity
+
+
+class ServerSnapshot:
+    def __init__(self, online: dict | None, server: dict | None, up: bool | None):
+        self.online = online
+        self.server = server
+        self.up = up
+        self.taken_at = time.monotonic()
+
+
 class WebCraftAPIFeature(tgbot.IFeature):
 
-    def __init__(self, hostname: str, admin_authorization: str, https: bool = True, max_auth_frequency: int = 5):
+    def __init__(
+            self,
+            hostname: str,
+            admin_authorization: str,
+            https: bool = True,
+            max_auth_frequency: int = 5,
+            storage_backend: utils.IStorageBackend | None = None,
+            http_pool_size: int = 16,
+            http_retries: int = 2,
+            http_backoff: float = 0.2,
+            cache_ttls: dict[str, float] | None = None,
+            cache_stale_factor: float = 4,
+            cache_size: int = 256,
+            breaker_threshold: int = 5,
+            breaker_backoff: float = 1,
+            breaker_max_backoff: float = 60,
+            poll_interval: float | None = None,
+            bulk_workers: int = 4
+    ):
         super().__init__()
         print('组装服务器域名……')
         while hostname.endswith('/'):
@@ -50,17 +108,79 @@ class WebCraftAPIFeature(tgbot.IFeature):
         print('初始化本地数据库……')
         self.database_entrance = utils.StorageDataEntrance(
             'craft',
-            'craft_init.sql'
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'craft_init.sql'),
+            pooled=True,
+            migrations_dir=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'craft_migrations'),
+            write_behind=True,
+            backend=storage_backend
         )
         if self.database_entrance.first_create:
             print(f'首次创建 CRAFT 数据库！已生成第一个管理员认证码: {self.create_auth_code()}')
 
+        print('加载管理员列表……')
+        self.admin_lock = threading.Lock()
+        self.admin_ids: frozenset[int] = frozenset()
+        self.reload_admins()
+
         self.max_auth_frequency = max_auth_frequency
 
-        print('部署能力……')
+        print('建立 HTTP 连接池……')
         self.admin_authorization_headers = {
             'Authorization': admin_authorization
         }
+        self.session = requests.Session()
+        self.session.headers.update(self.admin_authorization_headers)
+        http_adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=http_pool_size,
+            max_retries=Retry(
+                total=http_retries,
+                connect=min(1, http_retries),
+                read=False,
+                backoff_factor=http_backoff,
+                allowed_methods=frozenset(['GET']),
+                status_forcelist=(502, 503, 504),
+                raise_on_status=False
+            )
+        )
+        self.session.mount('http://', http_adapter)
+        self.session.mount('https://', http_adapter)
+        self.single_flight = utils.SingleFlight()
+        self.breaker = utils.CircuitBreaker(breaker_threshold, breaker_backoff, breaker_max_backoff)
+        self.unreachable_reply = '服务器暂时无法连接，请稍后再试！'
+        self.outage_notice = '服务器暂时无法连接，以下为最近一次获取的数据：'
+
+        print('配置响应缓存……')
+        self.cache_ttls: dict[str, float] = {
+            '/api/v1/api': 300,
+            '/api/v1/server': 30,
+            '/api/v1/worlds': 60,
+            '/api/v1/worlds/{name}': 30,
+            '/api/v1/banlist/players': 30,
+        }
+        if cache_ttls is not None:
+            self.cache_ttls.update(cache_ttls)
+        self.cache_stale_factor = cache_stale_factor
+        self.response_cache = utils.TTLCache(cache_size)
+        self.last_known = utils.TTLCache(cache_size)
+        self.stale_reads = threading.local()
+        self.refreshing: set[str] = set()
+        self.refresh_lock = threading.Lock()
+        self.refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='craft-refresh')
+        self.bulk_executor = ThreadPoolExecutor(max_workers=bulk_workers, thread_name_prefix='craft-bulk')
+
+        print('加载订阅列表……')
+        self.push: Callable[[int, MsgReply | str], None] | None = None
+        self.subscription_lock = threading.Lock()
+        self.subscribers: frozenset[int] = frozenset()
+        self.reload_subscribers()
+        self.poll_interval = poll_interval
+        self.snapshot: ServerSnapshot | None = None
+        self.last_online: dict | None = None
+        self.poll_stop = threading.Event()
+        self.poll_thread: threading.Thread | None = None
+
+        print('部署能力……')
         self.abilities: dict[str, Ability] = {
             'ping': Ability(
                 lambda model: self.ping(model),
@@ -128,10 +248,40 @@ class WebCraftAPIFeature(tgbot.IFeature):
                 '解封玩家（管理员）',
                 admin_only=True,
                 private=True
+            ),
+            'banplayers': Ability(
+                lambda model, *players: self.banplayers(model, players),
+                '批量封禁玩家（管理员）',
+                admin_only=True,
+                private=True
+            ),
+            'unbanplayers': Ability(
+                lambda model, *players: self.unbanplayers(model, players),
+                '批量解封玩家（管理员）',
+                admin_only=True,
+                private=True
+            ),
+            'subscribe': Ability(
+                lambda model: self.subscribe(model),
+                '订阅玩家上下线与服务器状态通知',
+                private=True,
+                show_on_help_string='订阅通知'
+            ),
+            'unsubscribe': Ability(
+                lambda model: self.unsubscribe(model),
+                '取消订阅通知',
+                private=True
             )
         }
 
         print('配置帮助文档……')
+        self.back_to_help_keyboard = tgbot.EventKeyboard('返回帮助', 'CRAFT help')
+        self.back_to_help_reply = tgbot.FrozenMsgReply('', [self.back_to_help_keyboard])
+        self.help_keyboard = tgbot.EventKeyboard('查看帮助', 'CRAFT help')
+        self.unknown_ability_reply = tgbot.FrozenMsgReply('', [self.help_keyboard])
+        self.permission_denied_reply = self.unknown_ability_reply.with_msg('您无权使用该命令')
+        self.dispatch_table = self.compile_abilities()
+        self.help_cache: dict[tuple[bool, bool], tgbot.FrozenMsgReply] = {}
         self.basic_doc = '\n'.join(
             [
                 '本机器人专属于 Minecraft 群组 “红石巧构”',
@@ -143,142 +293,122 @@ class WebCraftAPIFeature(tgbot.IFeature):
             ]
         )
 
+        if self.poll_interval is not None:
+            print(f'启动服务器状态轮询，间隔 {self.poll_interval} 秒……')
+            self.poll_thread = threading.Thread(target=self.poll_loop, name='craft-poller', daemon=True)
+            self.poll_thread.start()
+
     def url(self, uri: str):
         return self.hostname + uri
 
+    def reload_admins(self):
+        records = self.database_entrance.select('authentication_code', 'owner_id is not null')
+        with self.admin_lock:
+            self.admin_ids = frozenset(record[1] for record in records or [])
+
+    def add_admin(self, user_id: int):
+        with self.admin_lock:
+            self.admin_ids = self.admin_ids | {user_id}
+
     def is_admin(self, model) -> bool:
-        send_id = model.from_user.id
-        select = self.database_entrance.select('authentication_code', f'owner_id = {send_id}')
-        return len(select) >= 1
+        return model.from_user.id in self.admin_ids
 
     def handle_command(self, model: telebot.types.Message):
-        content = tgbot.separate_command_and_content(model, 'craft')
-        print(f'Craft Command:', 'menu' if len(content) == 0 else content)
-        if content is not None:
-            portions = list(filter(lambda item: item != '', shlex.split(content)))
-            if len(portions) == 0 or portions[0] == 'help':
-                return self.help(model)
-            elif portions[0] in self.abilities:
-                target_ability = self.abilities[portions[0]]
-
-                in_group = tgbot.in_group(model)
-                if in_group and not target_ability.public:
-                    return tgbot.MsgReply(
-                        f'命令 {portions[0]} 无法在群组中使用',
-                        [
-                            tgbot.EventKeyboard('查看帮助', 'CRAFT help')
-                        ]
-                    )
-                elif not in_group and not target_ability.private:
-                    return tgbot.MsgReply(
-                        f'命令 {portions[0]} 无法在私聊中使用',
-                        [
-                            tgbot.EventKeyboard('查看帮助', 'CRAFT help')
-                        ]
-                    )
-
-                if not self.is_admin(model) and target_ability.admin_only:
-                    return tgbot.MsgReply(
-                        '您无权使用该命令',
-                        [
-                            tgbot.EventKeyboard('查看帮助', 'CRAFT help')
-                        ]
-                    )
-
-                param_num = len(inspect.signature(target_ability.func).parameters) - 1
-                if (param_num + 1) == len(portions):
-                    res = target_ability.func(model, *portions[1:])
-                    if isinstance(res, tgbot.MsgReply) and target_ability.show_back_to_help:
-                        res.events.append(tgbot.EventKeyboard('返回帮助', 'CRAFT help'))
-                    elif isinstance(res, str) and target_ability.show_back_to_help:
-                        res = tgbot.MsgReply(res, [tgbot.EventKeyboard('返回帮助', 'CRAFT help')])
-                    return res
-                else:
-                    return f'命令 {portions[0]} 需要接收 {param_num} 个参数'
-            else:
-                return tgbot.MsgReply(
-                    f'命令 {portions[0]} 不存在',
-                    [
-                        tgbot.EventKeyboard('查看帮助', 'CRAFT help')
-                    ]
-                )
+        context = tgbot.command_context(model)
+        if context.command == 'craft':
+            print(f'Craft Command:', 'menu' if len(context.tail) == 0 else context.tail)
+            return self.dispatch(model, context.args)
 
         return None
 
     def handle_event(self, call: telebot.types.CallbackQuery) -> MsgReply | str | None:
-        content = tgbot.separate_event_data_and_content(call, 'CRAFT')
-        print(f'Craft Event: {content}')
-        if content is not None:
-            portions = list(filter(lambda item: item != '', shlex.split(content)))
-            if len(portions) == 0 or portions[0] == 'help':
-                return self.help(call)
-            if portions[0] in self.abilities:
-                target_ability = self.abilities[portions[0]]
-                in_group = tgbot.in_group(call)
-                if in_group and not target_ability.public:
-                    return tgbot.MsgReply(
-                        f'命令 {portions[0]} 无法在群组中使用',
-                        [
-                            tgbot.EventKeyboard('查看帮助', 'CRAFT help')
-                        ]
-                    )
-                elif not in_group and not target_ability.private:
-                    return tgbot.MsgReply(
-                        f'命令 {portions[0]} 无法在私聊中使用',
-                        [
-                            tgbot.EventKeyboard('查看帮助', 'CRAFT help')
-                        ]
-                    )
-
-                if not self.is_admin(call) and target_ability.admin_only:
-                    return tgbot.MsgReply(
-                        '您无权使用该命令',
-                        [
-                            tgbot.EventKeyboard('查看帮助', 'CRAFT help')
-                        ]
-                    )
-
-                param_num = len(inspect.signature(target_ability.func).parameters) - 1
-                if (param_num + 1) == len(portions):
-                    res = target_ability.func(call, *portions[1:])
-                    if isinstance(res, tgbot.MsgReply) and target_ability.show_back_to_help:
-                        res.events.append(tgbot.EventKeyboard('返回帮助', 'CRAFT help'))
-                    elif isinstance(res, str) and target_ability.show_back_to_help:
-                        res = tgbot.MsgReply(res, [tgbot.EventKeyboard('返回帮助', 'CRAFT help')])
-                    return res
-                else:
-                    return f'命令 {portions[0]} 需要接收 {param_num} 个参数'
-            else:
-                return tgbot.MsgReply(
-                    f'命令 {portions[0]} 不存在',
-                    [
-                        tgbot.EventKeyboard('查看帮助', 'CRAFT help')
-                    ]
-                )
+        context = tgbot.event_context(call)
+        if context.event == 'CRAFT':
+            print(f'Craft Event: {context.tail}')
+            return self.dispatch(call, context.args)
 
         return None
 
+    def compile_abilities(self) -> dict[str, AbilityEntry]:
+        return {
+            name: AbilityEntry(name, ability, self.help_keyboard)
+            for name, ability in self.abilities.items()
+        }
+
+    def dispatch(self, model, portions: list[str]) -> MsgReply | str:
+        if len(portions) == 0 or portions[0] == 'help':
+            return self.help(model)
+        entry = self.dispatch_table.get(portions[0])
+        if entry is None:
+            return self.unknown_ability_reply.with_msg(f'命令 {portions[0]} 不存在')
+
+        in_group = tgbot.in_group(model)
+        if in_group and not entry.ability.public:
+            return entry.group_error
+        elif not in_group and not entry.ability.private:
+            return entry.private_error
+
+        if entry.ability.admin_only and not self.is_admin(model):
+            return self.permission_denied_reply
+
+        if not entry.accepts(len(portions) - 1):
+            return entry.arity_error
+
+        res = self.run_ability(entry.ability, model, portions[1:])
+        if isinstance(res, tgbot.MsgReply) and entry.ability.show_back_to_help:
+            res = res.with_events(self.back_to_help_keyboard)
+        elif isinstance(res, str) and entry.ability.show_back_to_help:
+            res = self.back_to_help_reply.with_msg(res)
+        return res
+
     def register_commands(self) -> list[str]:
         return ['craft']
 
-    def ability_filter(self, model):
-        in_group = tgbot.in_group(model)
+    def bind_push(self, push: Callable[[int, MsgReply | str], None]):
+        self.push = push
+
+    def close(self):
+        self.poll_stop.set()
+        if self.poll_thread is not None:
+            self.poll_thread.join()
+        self.refresh_executor.shutdown(wait=False, cancel_futures=True)
+        self.bulk_executor.shutdown(wait=True)
+        self.session.close()
+        self.database_entrance.close()
+
+    def register_events(self) -> list[str]:
+        return ['CRAFT']
+
+    def register_ability(self, name: str, ability: Ability):
+        self.abilities[name] = ability
+        self.dispatch_table[name] = AbilityEntry(name, ability, self.help_keyboard)
+        self.help_cache.clear()
+
+    def ability_filter(self, in_group: bool, is_admin: bool):
         res = {}
         for key, ability in self.abilities.items():
             if in_group and not ability.public:
                 continue
             if not in_group and not ability.private:
                 continue
-            if ability.admin_only and not self.is_admin(model):
+            if ability.admin_only and not is_admin:
                 continue
             res[key] = ability
 
         return res
 
     def help(self, model):
-        abilities = self.ability_filter(model)
+        key = (tgbot.in_group(model), self.is_admin(model))
+        reply = self.help_cache.get(key)
+        if reply is None:
+            reply = self.render_help(*key)
+            self.help_cache[key] = reply
+        return reply
 
-        return tgbot.MsgReply(
+    def render_help(self, in_group: bool, is_admin: bool) -> tgbot.FrozenMsgReply:
+        abilities = self.ability_filter(in_group, is_admin)
+
+        return tgbot.FrozenMsgReply(
             self.basic_doc + '\n' + '\n'.join(
                 [f' - {command} {ability.instruction}' for command, ability in abilities.items()]
             ),
@@ -289,19 +419,20 @@ class WebCraftAPIFeature(tgbot.IFeature):
             ]
         )
 
-    def out_of_frequency(self, user_id: str):
-        target_record = self.database_entrance.select('try_apply_record', f'id = {user_id}')
+    def out_of_frequency(self, user_id: int):
+        target_record = self.database_entrance.select('try_apply_record', 'id = ?', (user_id,))
         if len(target_record) == 0:
             return False
         return self.max_auth_frequency - target_record[0][1] <= 0
 
-    def record_try(self, user_id: str):
-        if len(self.database_entrance.select('try_apply_record', f'id = {user_id}')) == 0:
+    def record_try(self, user_id: int):
+        if len(self.database_entrance.select('try_apply_record', 'id = ?', (user_id,))) == 0:
             self.database_entrance.insert(
                 'try_apply_record',
                 {
-                    'id': f'"{user_id}"'
-                }
+                    'id': '?'
+                },
+                (user_id,)
             )
         else:
             self.database_entrance.update(
@@ -309,58 +440,197 @@ class WebCraftAPIFeature(tgbot.IFeature):
                 {
                     'apply_times': 'apply_times + 1'
                 },
-                f'id = "{user_id}"'
+                'id = ?',
+                (user_id,)
             )
 
-        return self.max_auth_frequency - self.database_entrance.select('try_apply_record', f'id = "{user_id}"')[0][1]
+        return self.max_auth_frequency - self.database_entrance.select('try_apply_record', 'id = ?', (user_id,))[0][1]
 
     def authentication(self, model, password: str):
         if self.is_admin(model):
             return '您已是管理员，请勿重复认证'
         if self.out_of_frequency(model.from_user.id):
             return '您无法进行认证'
-        target = self.database_entrance.select(
+        claimed = self.database_entrance.update(
             'authentication_code',
-            f'owner_id is null and uuid = "{password}"'
+            {
+                'owner_id': '?'
+            },
+            'uuid = ? and owner_id is null',
+            (model.from_user.id, password),
+            sync=True
         )
-        if len(target) == 0:
+        if claimed != 1:
             frequency = self.record_try(model.from_user.id)
             return f'认证失败\n您还剩下 {frequency} 次尝试机会'
         else:
-            self.database_entrance.update(
-                'authentication_code',
-                {
-                    'owner_id': f'{model.from_user.id}'
-                },
-                f'uuid = "{password}"'
-            )
+            self.add_admin(model.from_user.id)
             return '认证成功！'
 
     def create_auth_code(self) -> str:
         au_code = str(uuid.uuid4())
         self.database_entrance.insert('authentication_code', {
-            'uuid': f'"{au_code}"'
-        })
+            'uuid': '?'
+        }, (au_code,))
         return au_code
 
     def generate_auth_code(self, model):
         return f'认证码生成成功！\n{self.create_auth_code()}\n请谨慎使用！'
 
+    def reload_subscribers(self):
+        records = self.database_entrance.select('craft_subscription')
+        with self.subscription_lock:
+            self.subscribers = frozenset(record[0] for record in records or [])
+
+    def subscribe(self, model):
+        chat_id = tgbot.chat_id(model)
+        with self.subscription_lock:
+            if chat_id in self.subscribers:
+                return '当前会话已订阅通知'
+            self.subscribers = self.subscribers | {chat_id}
+        self.database_entrance.insert('craft_subscription', {'chat_id': '?'}, (chat_id,))
+        if self.poll_interval is None:
+            return '订阅成功！\n注意：服务器状态轮询未启用，暂时不会收到通知'
+        return '订阅成功！玩家上下线与服务器状态变化将推送到当前会话'
+
+    def unsubscribe(self, model):
+        chat_id = tgbot.chat_id(model)
+        with self.subscription_lock:
+            if chat_id not in self.subscribers:
+                return '当前会话未订阅通知'
+            self.subscribers = self.subscribers - {chat_id}
+        self.database_entrance.remove('craft_subscription', 'chat_id = ?', (chat_id,))
+        return '已取消订阅'
+
+    def poll_loop(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                print(f'服务器状态轮询异常：{e}')
+            if self.poll_stop.wait(self.poll_interval):
+                return
+
+    def poll(self):
+        online = self.get_request(
+            '/api/v1/players/online',
+            normal_body=lambda body: 'onlinePlayers' in body
+        )
+        server = self.get_request(
+            '/api/v1/server',
+            normal_body=lambda body: 'serverName' in body
+        )
+        previous = self.snapshot
+        if not isinstance(server, str):
+            up = server['running']
+        elif self.breaker.is_open:
+            up = False
+        else:
+            up = None if previous is None else previous.up
+        self.snapshot = ServerSnapshot(
+            None if isinstance(online, str) else online,
+            None if isinstance(server, str) else server,
+            up
+        )
+        changes = self.snapshot_changes(previous, self.snapshot, self.last_online)
+        if self.snapshot.online is not None:
+            self.last_online = self.snapshot.online
+        if len(changes) > 0 and self.push is not None:
+            notice = '\n'.join(changes)
+            for chat_id in self.subscribers:
+                self.push(chat_id, notice)
+
+    @staticmethod
+    def snapshot_changes(
+            previous: ServerSnapshot | None,
+            current: ServerSnapshot,
+            last_online: dict | None
+    ) -> list[str]:
+        if previous is None:
+            return []
+        if previous.up is True and current.up is False:
+            return ['服务器已离线！']
+        changes = []
+        if previous.up is False and current.up is True:
+            changes.append('服务器已恢复在线')
+        if last_online is not None and current.online is not None:
+            before = set(last_online['online'])
+            after = set(current.online['online'])
+            changes += [f'玩家 {player} 加入了服务器' for player in sorted(after - before)]
+            changes += [f'玩家 {player} 离开了服务器' for player in sorted(before - after)]
+        return changes
+
+    def snapshot_read(self, field: str) -> dict | None:
+        snapshot = self.snapshot
+        if snapshot is None or time.monotonic() - snapshot.taken_at > self.poll_interval * 2:
+            return None
+        return getattr(snapshot, field)
+
+    def record_upstream(self, method: str, endpoint: str, outcome: str, started: float):
+        labels = {'method': method, 'endpoint': endpoint}
+        tgmetrics.metrics.inc('upstream_requests_total', {**labels, 'outcome': outcome})
+        tgmetrics.metrics.observe('upstream_latency_seconds', labels, time.perf_counter() - started)
+        if outcome in ('timeout', 'error') or outcome.startswith('5'):
+            backoff = self.breaker.record_failure()
+            if backoff is not None:
+                print(f'服务器连续 {self.breaker.failures} 次请求失败，熔断 {backoff} 秒')
+                tgmetrics.metrics.inc('upstream_circuit_open_total', {})
+        elif self.breaker.record_success():
+            print('服务器连接已恢复')
+
+    def reject_upstream(self, method: str, endpoint: str) -> str | None:
+        if self.breaker.allow():
+            return None
+        tgmetrics.metrics.inc('upstream_requests_total', {'method': method, 'endpoint': endpoint, 'outcome': 'rejected'})
+        return self.unreachable_reply
+
+    def run_ability(self, ability: Ability, model, args: list[str]):
+        self.stale_reads.served = False
+        res = ability.func(model, *args)
+        if self.stale_reads.served:
+            if isinstance(res, tgbot.MsgReply):
+                res = tgbot.MsgReply(f'{self.outage_notice}\n{res.msg}', list(res.events or []))
+            elif isinstance(res, str):
+                res = f'{self.outage_notice}\n{res}'
+        return res
+
     def get_request(
             self,
             uri: str,
             headers: dict | None = None,
             normal_body: Callable[[dict], bool] = lambda _: True,
-            normal_status: str = '200'
+            normal_status: str = '200',
+            endpoint: str | None = None
+    ) -> dict | str:
+        if headers is not None:
+            return self.send_get(uri, headers, normal_body, normal_status, endpoint)
+        data, shared = self.single_flight.do(
+            f'GET {uri}',
+            lambda: self.send_get(uri, headers, normal_body, normal_status, endpoint)
+        )
+        if shared:
+            tgmetrics.metrics.inc('upstream_coalesced_total', {'method': 'GET', 'endpoint': uri if endpoint is None else endpoint})
+        return data
+
+    def send_get(
+            self,
+            uri: str,
+            headers: dict | None,
+            normal_body: Callable[[dict], bool],
+            normal_status: str,
+            endpoint: str | None
     ) -> dict | str:
+        rejected = self.reject_upstream('GET', uri if endpoint is None else endpoint)
+        if rejected is not None:
+            return rejected
         url = self.url(uri)
+        started = time.perf_counter()
+        outcome = 'error'
         try:
-            if headers is None:
-                print('GET:', url)
-                response = requests.get(url, timeout=(5, 10))
-            else:
-                response = requests.get(url, timeout=(5, 10), headers=headers)
-            if str(response.status_code) != normal_status:
+            print('GET:', url)
+            response = self.session.get(url, timeout=(5, 10), headers=headers)
+            outcome = str(response.status_code)
+            if outcome != normal_status:
                 return f'响应状态码异常：{response.status_code}'
             body = response.json()
             if normal_body(body):
@@ -369,10 +639,19 @@ class WebCraftAPIFeature(tgbot.IFeature):
                 print(f'服务器响应{url}异常！响应内容：{body}')
                 return '服务器响应异常！'
         except requests.exceptions.Timeout:
+            outcome = 'timeout'
             return '服务器连接超时！'
+        except requests.exceptions.ConnectionError as e:
+            if is_timeout(e):
+                outcome = 'timeout'
+                return '服务器连接超时！'
+            print(f'服务器响应{url}未知异常！异常内容：{e}')
+            return f'未知异常！'
         except Exception as e:
             print(f'服务器响应{url}未知异常！异常内容：{e}')
             return f'未知异常！'
+        finally:
+            self.record_upstream('GET', uri if endpoint is None else endpoint, outcome, started)
 
     def post_request(
             self,
@@ -380,16 +659,20 @@ class WebCraftAPIFeature(tgbot.IFeature):
             body: dict,
             headers: dict | None = None,
             normal_body: Callable[[dict], bool] = lambda _: True,
-            normal_status: str = '202'
+            normal_status: str = '202',
+            endpoint: str | None = None
     ) -> dict | str:
+        rejected = self.reject_upstream('POST', uri if endpoint is None else endpoint)
+        if rejected is not None:
+            return rejected
         url = self.url(uri)
+        started = time.perf_counter()
+        outcome = 'error'
         try:
-            if headers is None:
-                print('POST:', url)
-                response = requests.post(url, json.dumps(body), timeout=(5, 10))
-            else:
-                response = requests.post(url, json.dumps(body), timeout=(5, 10), headers=headers)
-            if str(response.status_code) != normal_status:
+            print('POST:', url)
+            response = self.session.post(url, json.dumps(body), timeout=(5, 10), headers=headers)
+            outcome = str(response.status_code)
+            if outcome != normal_status:
                 return f'响应状态码异常：{response.status_code}'
             body = response.json()
             if normal_body(body):
@@ -398,10 +681,73 @@ class WebCraftAPIFeature(tgbot.IFeature):
                 print(f'服务器响应{url}异常！响应内容：{body}')
                 return '服务器响应异常！'
         except requests.exceptions.Timeout:
+            outcome = 'timeout'
             return '服务器连接超时！'
+        except requests.exceptions.ConnectionError as e:
+            if is_timeout(e):
+                outcome = 'timeout'
+                return '服务器连接超时！'
+            print(f'服务器响应{url}未知异常！异常内容：{e}')
+            return f'未知异常！'
         except Exception as e:
             print(f'服务器响应{url}未知异常！异常内容：{e}')
             return f'未知异常！'
+        finally:
+            self.record_upstream('POST', uri if endpoint is None else endpoint, outcome, started)
+
+    def cached_get(
+            self,
+            uri: str,
+            normal_body: Callable[[dict], bool] = lambda _: True,
+            endpoint: str | None = None
+    ) -> dict | str:
+        endpoint = uri if endpoint is None else endpoint
+        ttl = self.cache_ttls.get(endpoint)
+        if ttl is None:
+            return self.get_request(uri, normal_body=normal_body, endpoint=endpoint)
+
+        entry = self.response_cache.get(uri)
+        if entry is not None:
+            if entry.fresh_until <= time.monotonic():
+                if self.breaker.is_open:
+                    self.stale_reads.served = True
+                self.refresh_in_background(uri, normal_body, endpoint, ttl)
+            return entry.value
+
+        data = self.get_request(uri, normal_body=normal_body, endpoint=endpoint)
+        if not isinstance(data, str):
+            self.remember(uri, data, ttl)
+        elif self.breaker.is_open:
+            entry = self.last_known.get(uri)
+            if entry is not None:
+                self.stale_reads.served = True
+                return entry.value
+        return data
+
+    def remember(self, uri: str, data: dict, ttl: float):
+        self.response_cache.put(uri, data, ttl, ttl * self.cache_stale_factor)
+        self.last_known.put(uri, data, float('inf'))
+
+    def refresh_in_background(self, uri: str, normal_body: Callable[[dict], bool], endpoint: str, ttl: float):
+        with self.refresh_lock:
+            if uri in self.refreshing:
+                return
+            self.refreshing.add(uri)
+
+        def refresh():
+            try:
+                data = self.get_request(uri, normal_body=normal_body, endpoint=endpoint)
+                if not isinstance(data, str):
+                    self.remember(uri, data, ttl)
+            finally:
+                with self.refresh_lock:
+                    self.refreshing.discard(uri)
+
+        try:
+            self.refresh_executor.submit(refresh)
+        except RuntimeError:
+            with self.refresh_lock:
+                self.refreshing.discard(uri)
 
     def ping(self, model):
         response_body = self.get_request(
@@ -414,7 +760,7 @@ class WebCraftAPIFeature(tgbot.IFeature):
 
     def api(self, model):
 
-        response_body = self.get_request(
+        response_body = self.cached_get(
             '/api/v1/api',
             normal_body=lambda body: 'name' in body
         )
@@ -431,10 +777,12 @@ class WebCraftAPIFeature(tgbot.IFeature):
         )
 
     def server(self, model):
-        data = self.get_request(
-            '/api/v1/server',
-            normal_body=lambda body: 'serverName' in body
-        )
+        data = self.snapshot_read('server')
+        if data is None:
+            data = self.cached_get(
+                '/api/v1/server',
+                normal_body=lambda body: 'serverName' in body
+            )
         if isinstance(data, str):
             return data
         return '核心名称：{}\n版本：{}\nBukkit 版本：{}\nIP：{}\n端口：{}\n标题：{}\n状态：{}'.format(
@@ -448,10 +796,12 @@ class WebCraftAPIFeature(tgbot.IFeature):
         )
 
     def onlineplayers(self, model):
-        data = self.get_request(
-            '/api/v1/players/online',
-            normal_body=lambda body: 'onlinePlayers' in body
-        )
+        data = self.snapshot_read('online')
+        if data is None:
+            data = self.get_request(
+                '/api/v1/players/online',
+                normal_body=lambda body: 'onlinePlayers' in body
+            )
         if isinstance(data, str):
             return data
         if data['onlinePlayers'] == 0:
@@ -461,7 +811,7 @@ class WebCraftAPIFeature(tgbot.IFeature):
                 data['onlinePlayers']) + '\n'.join(f' - {player}' for player in data['online'])
 
     def world(self, model):
-        data = self.get_request(
+        data = self.cached_get(
             '/api/v1/worlds',
             normal_body=lambda body: 'worldCount' in body
         )
@@ -478,9 +828,10 @@ class WebCraftAPIFeature(tgbot.IFeature):
         )
 
     def worldinfo(self, model, worldname):
-        data = self.get_request(
+        data = self.cached_get(
             f'/api/v1/worlds/{worldname}',
-            normal_body=lambda body: 'name' in body
+            normal_body=lambda body: 'name' in body,
+            endpoint='/api/v1/worlds/{name}'
         )
         if isinstance(data, str):
             return data
@@ -501,8 +852,7 @@ class WebCraftAPIFeature(tgbot.IFeature):
     def broadcast(self, model, msg):
         data = self.post_request(
             '/api/v1/chat/broadcast/all',
-            {'message': f'[Telegram @{model.from_user.username}] {msg}'},
-            headers=self.admin_authorization_headers
+            {'message': f'[Telegram @{model.from_user.username}] {msg}'}
         )
         if isinstance(data, str):
             return data
@@ -513,7 +863,7 @@ class WebCraftAPIFeature(tgbot.IFeature):
         )
 
     def banlist(self, model):
-        data = self.get_request(
+        data = self.cached_get(
             '/api/v1/banlist/players',
             normal_body=lambda body: 'bannedPlayers' in body
         )
@@ -530,11 +880,12 @@ class WebCraftAPIFeature(tgbot.IFeature):
             '/api/v1/banlist/players/ban',
             {
                 'player': player
-            },
-            headers=self.admin_authorization_headers
+            }
         )
         if isinstance(data, str):
             return data
+        if data['success']:
+            self.response_cache.invalidate('/api/v1/banlist/players')
         return '{}\n代码：{}\n消息：{}'.format(
             '封禁成功' if data['success'] else '封禁失败',
             data['code'],
@@ -546,13 +897,37 @@ class WebCraftAPIFeature(tgbot.IFeature):
             '/api/v1/banlist/players/pardon',
             {
                 'player': player
-            },
-            headers=self.admin_authorization_headers
+            }
         )
         if isinstance(data, str):
             return data
+        if data['success']:
+            self.response_cache.invalidate('/api/v1/banlist/players')
         return '{}\n代码：{}\n消息：{}'.format(
             '解封成功' if data['success'] else '解封失败',
             data['code'],
             data['message']
         )
+
+    def bulk_ban_request(self, uri: str, players: tuple[str, ...], action: str) -> str:
+        players = list(dict.fromkeys(players))
+        results = list(self.bulk_executor.map(lambda player: self.post_request(uri, {'player': player}), players))
+        lines = []
+        succeeded = 0
+        for player, data in zip(players, results):
+            if isinstance(data, str):
+                lines.append(f' - {player}：{data}')
+            elif data['success']:
+                succeeded += 1
+                lines.append(f' - {player}：{action}成功')
+            else:
+                lines.append(f' - {player}：{action}失败（{data["code"]} {data["message"]}）')
+        if succeeded > 0:
+            self.response_cache.invalidate('/api/v1/banlist/players')
+        return f'批量{action}完成：成功 {succeeded} / 共 {len(players)}\n' + '\n'.join(lines)
+
+    def banplayers(self, model, players: tuple[str, ...]):
+        return self.bulk_ban_request('/api/v1/banlist/players/ban', players, '封禁')
+
+    def unbanplayers(self, model, players: tuple[str, ...]):
+        return self.bulk_ban_request('/api/v1/banlist/players/pardon', players, '解封')
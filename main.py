@@ -1,26 +1,60 @@
-from feature2048 import _2048Feature
-from featuredebug import DebugFeature
-from featurewebcraftapi import WebCraftAPIFeature
+import time
+
+boot_started = time.perf_counter()
 
-from tgbot import build_bot
 import os
 from dotenv import load_dotenv
 
+from tgbot import build_bot, import_report, lazy_feature
+from utils import SQLiteStorageBackend
+
+import_report['dotenv, tgbot, utils'] = time.perf_counter() - boot_started
+
 load_dotenv()
 
 tgbot_token = os.getenv('TGBOT_TOKEN')
 web_craft_hostname = os.getenv('CRAFT_HOST_NAME')
 admin_authorization = os.getenv('ADMIN_AUTHORIZATION')
+tgbot_workers = os.getenv('TGBOT_WORKERS')
+tgbot_runtime = os.getenv('TGBOT_RUNTIME', 'thread')
+tgbot_mode = os.getenv('TGBOT_MODE', 'polling')
+webhook_url = os.getenv('WEBHOOK_URL')
+webhook_port = os.getenv('WEBHOOK_PORT', '8443')
+webhook_secret = os.getenv('WEBHOOK_SECRET')
+metrics_port = os.getenv('METRICS_PORT')
+save_dir = os.getenv('SAVE_DIR', 'save')
+craft_poll_interval = os.getenv('CRAFT_POLL_INTERVAL')
 
 if __name__ == '__main__':
     build_bot(
         features=[
-            DebugFeature(),
-            WebCraftAPIFeature(web_craft_hostname, admin_authorization, https=False),
-            _2048Feature()
+            lazy_feature('featuredebug', 'DebugFeature', ['debug'], ['DEBUG']),
+            lazy_feature(
+                'featurewebcraftapi',
+                'WebCraftAPIFeature',
+                ['craft'],
+                ['CRAFT'],
+                args=(web_craft_hostname, admin_authorization),
+                kwargs={
+                    'https': False,
+                    'storage_backend': SQLiteStorageBackend(save_dir),
+                    'poll_interval': None if craft_poll_interval is None else float(craft_poll_interval)
+                },
+                preload=craft_poll_interval is not None
+            ),
+            lazy_feature('feature2048', '_2048Feature', ['2048', 'up', 'down', 'left', 'right'])
         ],
         bot_meta={
             'type': 'telegram',
-            'token': tgbot_token
+            'token': tgbot_token,
+            'boot_started': boot_started,
+            'runtime': tgbot_runtime,
+            'mode': tgbot_mode,
+            'webhook_url': webhook_url,
+            'webhook_port': webhook_port,
+            'secret_token': webhook_secret,
+            'outbound': True,
+            'metrics_port': metrics_port,
+            'workers': None if tgbot_workers is None else int(tgbot_workers)
         }
     ).run()
@@ -25,6 +25,9 @@ class TestFeature(tgbot.IFeature):
     def register_commands(self) -> list[str]:
         return ['test']
 
+    def register_events(self) -> list[str]:
+        return ['TEST_EVENT']
+
 
 def split_special_string(s):
     # 使用 shlex.split() 方法分割字符串
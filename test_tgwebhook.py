@@ -0,0 +1,79 @@
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from tgwebhook import WebhookConfig, WebhookServer
+
+UPDATE = {
+    'update_id': 1,
+    'message': {
+        'message_id': 1,
+        'date': 0,
+        'chat': {'id': 1, 'type': 'private'},
+        'from': {'id': 1, 'is_bot': False, 'first_name': 'user'},
+        'text': '/debug'
+    }
+}
+
+
+class WebhookServerTest(unittest.TestCase):
+    def setUp(self):
+        self.updates = []
+        self.received = threading.Event()
+
+        def on_update(update):
+            self.updates.append(update)
+            self.received.set()
+
+        self.server = WebhookServer(
+            WebhookConfig(host='127.0.0.1', port=0, path='/hook', secret_token='secret'),
+            on_update
+        ).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+
+    def post(self, path: str = '/hook', token: str | None = None, body: bytes | None = None) -> int:
+        request = urllib.request.Request(
+            f'http://127.0.0.1:{self.server.port}{path}',
+            data=json.dumps(UPDATE).encode('utf-8') if body is None else body,
+            method='POST'
+        )
+        if token is not None:
+            request.add_header('X-Telegram-Bot-Api-Secret-Token', token)
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def test_valid_token_delivers_update(self):
+        self.assertEqual(self.post(token='secret'), 200)
+        self.assertTrue(self.received.wait(5))
+        self.assertEqual(self.updates[0].message.text, '/debug')
+
+    def test_wrong_token_is_rejected(self):
+        self.assertEqual(self.post(token='guess'), 403)
+        self.assertEqual(self.updates, [])
+
+    def test_missing_token_is_rejected(self):
+        self.assertEqual(self.post(), 403)
+        self.assertEqual(self.updates, [])
+
+    def test_wrong_path_is_rejected(self):
+        self.assertEqual(self.post(path='/other', token='secret'), 404)
+
+    def test_invalid_body_is_rejected(self):
+        self.assertEqual(self.post(token='secret', body=b'not json'), 400)
+
+    def test_secret_is_required(self):
+        with self.assertRaises(Exception):
+            WebhookConfig.from_meta({'mode': 'webhook'})
+        with self.assertRaises(Exception):
+            WebhookServer(WebhookConfig(host='127.0.0.1', port=0), lambda update: None)
+
+
+if __name__ == '__main__':
+    unittest.main()
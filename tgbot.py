@@ -1,19 +1,89 @@
+import asyncio
+import importlib
+import inspect
 import re
+import shlex
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable
 
 import telebot
 
 from abc import abstractmethod
 
+import tgmetrics
+from tgoutbound import OutboundDispatcher
+from utils import ChatDispatcher
+from tgwebhook import WebhookConfig, WebhookServer
+
+
+class ArgsContext:
+    def __init__(self, text: str):
+        portions = re.split(r'\s', text, maxsplit=1)
+        self.head = portions[0]
+        self.tail = portions[1] if len(portions) > 1 else ''
+        self.parsed_args: list[str] | None = None
+
+    @property
+    def args(self) -> list[str]:
+        if self.parsed_args is None:
+            self.parsed_args = [item for item in shlex.split(self.tail) if item != '']
+        return self.parsed_args
+
+
+class CommandContext(ArgsContext):
+    def __init__(self, text: str):
+        super().__init__(text)
+        self.command: str | None = None
+        self.bot_name: str | None = None
+        if self.head.startswith('/'):
+            self.command, _, bot_name = self.head[1:].partition('@')
+            self.bot_name = bot_name if bot_name != '' else None
+
+
+class EventContext(ArgsContext):
+    def __init__(self, data: str):
+        super().__init__(data)
+        self.event = self.head
+
+
+def command_context(model) -> CommandContext:
+    context = getattr(model, 'command_context', None)
+    if context is None:
+        context = CommandContext(model.text or '')
+        model.command_context = context
+    return context
+
+
+def event_context(call) -> EventContext:
+    context = getattr(call, 'event_context', None)
+    if context is None:
+        context = EventContext(call.data or '')
+        call.event_context = context
+    return context
+
+
+def extract_command(model) -> str | None:
+    return command_context(model).command
+
+
+def extract_event(call) -> str:
+    return event_context(call).event
+
 
 def separate_command_and_content(model, target_command) -> str | None:
-    if re.split(r'\s', model.text)[0] == f'/{target_command}':
-        return model.text[len(target_command) + 2:]
+    context = command_context(model)
+    if context.command == target_command:
+        return context.tail
     return None
 
 
 def separate_event_data_and_content(call, target_event) -> str | None:
-    if re.split(r'\s', call.data)[0] == target_event:
-        return call.data[len(target_event) + 1:]
+    context = event_context(call)
+    if context.event == target_event:
+        return context.tail
     return None
 
 
@@ -27,12 +97,30 @@ def in_group(model) -> bool:
         raise Exception('Unknown Model!')
 
 
+def chat_id(model) -> int:
+    if isinstance(model, telebot.types.CallbackQuery):
+        return model.message.chat.id
+    elif isinstance(model, telebot.types.Message):
+        return model.chat.id
+    else:
+        print('Unknown Model!')
+        raise Exception('Unknown Model!')
+
+
 class EventKeyboard:
     def __init__(self, title, event):
         self.title = title
         self.event = event
 
 
+class FrozenKeyboard(telebot.types.JsonSerializable):
+    def __init__(self, keyboard: telebot.types.InlineKeyboardMarkup):
+        self.json = keyboard.to_json()
+
+    def to_json(self):
+        return self.json
+
+
 class MsgReply:
     def __init__(self, msg, events: list[EventKeyboard] | None = None):
         self.msg = msg
@@ -53,6 +141,56 @@ class MsgReply:
     def empty_event(self):
         return self.events is None or len(self.events) == 0
 
+    def with_events(self, *events: EventKeyboard):
+        return MsgReply(self.msg, [*(self.events or []), *events])
+
+
+class FrozenMsgReply(MsgReply):
+    def __init__(
+            self,
+            msg,
+            events: list[EventKeyboard] | tuple[EventKeyboard, ...] | None = None,
+            markup: FrozenKeyboard | None = None
+    ):
+        super().__init__(msg, tuple(events or ()))
+        if markup is None and not self.empty_event():
+            markup = FrozenKeyboard(super().reply_markup())
+        self.markup = markup
+        self.frozen = True
+
+    def __setattr__(self, key, value):
+        if getattr(self, 'frozen', False):
+            raise AttributeError(f'{self.__class__.__name__} is immutable')
+        super().__setattr__(key, value)
+
+    def reply_markup(self):
+        return self.markup
+
+    def with_msg(self, msg):
+        return FrozenMsgReply(msg, self.events, self.markup)
+
+
+def reply_content(response: MsgReply | str) -> tuple[str, dict]:
+    if isinstance(response, str):
+        return response, {}
+    elif response.empty_event():
+        return response.msg, {}
+    else:
+        return response.msg, {'reply_markup': response.reply_markup()}
+
+
+def content_signature(text: str, options: dict) -> tuple:
+    markup = options.get('reply_markup')
+    return text, None if markup is None else markup.to_json()
+
+
+def edit_changed(call, content: tuple) -> bool:
+    return content != message_signature(call.message)
+
+
+def message_signature(message) -> tuple:
+    return message.text, None if message.reply_markup is None else message.reply_markup.to_json()
+
 
 class IFeature:
 
@@ -71,79 +209,534 @@ class IFeature:
     def register_commands(self) -> list[str]:
         return []
 
+    def register_events(self) -> list[str]:
+        return []
+
+    def catch_all(self) -> bool:
+        return False
+
+    def feature_name(self) -> str:
+        return self.__class__.__name__
+
+    def resolve(self):
+        return self
+
+    def bind_push(self, push: Callable[[int, MsgReply | str], None]):
+        pass
+
+    def close(self):
+        pass
+
+
+class AsyncIFeature(IFeature):
+
+    @abstractmethod
+    async def handle_command(self, model) -> MsgReply | str | None:
+        return None
+
+    @abstractmethod
+    async def handle_event(self, call) -> MsgReply | str | None:
+        return None
+
+
+class LazyFeature(IFeature):
+
+    def __init__(
+            self,
+            name: str,
+            factory: Callable[[], IFeature],
+            commands: list[str],
+            events: list[str] | None = None,
+            catch_all: bool = False,
+            preload: bool = False,
+            asynchronous: bool = False
+    ):
+        self.name = name
+        self.factory = factory
+        self.commands = commands
+        self.events = [] if events is None else events
+        self.is_catch_all = catch_all
+        self.preload = preload
+        self.asynchronous = asynchronous
+        self.push: Callable[[int, MsgReply | str], None] | None = None
+        self.instance: IFeature | None = None
+        self.lock = threading.Lock()
+        print(f'\n* 登记延迟部署 {name} *')
+
+    @property
+    def loaded(self) -> bool:
+        return self.instance is not None
+
+    def resolve(self) -> IFeature:
+        if self.instance is None:
+            with self.lock:
+                if self.instance is None:
+                    started = time.perf_counter()
+                    instance = self.factory()
+                    self.check_registration(instance)
+                    if self.push is not None:
+                        instance.bind_push(self.push)
+                    self.instance = instance
+                    print(f'{self.name} 部署完成，耗时 {time.perf_counter() - started:.3f} 秒')
+        return self.instance
+
+    def check_registration(self, instance: IFeature):
+        declared = (sorted(self.commands), sorted(self.events), self.is_catch_all)
+        actual = (sorted(instance.register_commands()), sorted(instance.register_events()), instance.catch_all())
+        if isinstance(instance, AsyncIFeature) != self.asynchronous:
+            instance.close()
+            raise Exception(
+                f'{self.name} was registered as {"async" if self.asynchronous else "sync"} '
+                f'but {instance.__class__.__name__} is {"sync" if self.asynchronous else "async"}'
+            )
+        if declared != actual:
+            instance.close()
+            raise Exception(
+                f'{self.name} was registered with commands/events/catch_all {declared} '
+                f'but provides {actual}'
+            )
+
+    def handle_command(self, model) -> MsgReply | str | None:
+        return self.resolve().handle_command(model)
+
+    def handle_event(self, call) -> MsgReply | str | None:
+        return self.resolve().handle_event(call)
+
+    def register_commands(self) -> list[str]:
+        return self.commands
+
+    def register_events(self) -> list[str]:
+        return self.events
+
+    def catch_all(self) -> bool:
+        return self.is_catch_all
+
+    def feature_name(self) -> str:
+        return self.name
+
+    def bind_push(self, push: Callable[[int, MsgReply | str], None]):
+        with self.lock:
+            self.push = push
+            if self.instance is not None:
+                self.instance.bind_push(push)
+
+    def close(self):
+        if self.instance is not None:
+            self.instance.close()
+
+
+def is_async_feature(feature: IFeature) -> bool:
+    return isinstance(feature, AsyncIFeature) or isinstance(feature, LazyFeature) and feature.asynchronous
+
+
+import_report: dict[str, float] = {}
+
+
+def timed_import(module_name: str):
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    if module_name not in import_report:
+        import_report[module_name] = time.perf_counter() - started
+        print(f'导入 {module_name}：{import_report[module_name]:.3f} 秒')
+    return module
+
+
+def lazy_feature(
+        module_name: str,
+        class_name: str,
+        commands: list[str],
+        events: list[str] | None = None,
+        catch_all: bool = False,
+        args: tuple = (),
+        kwargs: dict | None = None,
+        preload: bool = False,
+        asynchronous: bool = False
+) -> LazyFeature:
+    return LazyFeature(
+        class_name,
+        lambda: getattr(timed_import(module_name), class_name)(*args, **({} if kwargs is None else kwargs)),
+        commands,
+        events,
+        catch_all,
+        preload,
+        asynchronous
+    )
+
+
+def print_startup_report(boot_started: float):
+    print('\n* 启动报告 *')
+    for module_name, seconds in import_report.items():
+        print(f'导入 {module_name}：{seconds:.3f} 秒')
+    print(f'启动耗时：{time.perf_counter() - boot_started:.3f} 秒')
+
+
+class AsyncChatLocks:
+    def __init__(self):
+        self.locks: dict[int, asyncio.Lock] = {}
+        self.holders: dict[int, int] = {}
+
+    async def run(self, chat_id: int, task: Callable[[], Awaitable[None]]):
+        lock = self.locks.setdefault(chat_id, asyncio.Lock())
+        self.holders[chat_id] = self.holders.get(chat_id, 0) + 1
+        try:
+            async with lock:
+                await task()
+        except Exception as e:
+            print(f'会话 {chat_id} 处理更新异常：{e}')
+        finally:
+            self.holders[chat_id] -= 1
+            if self.holders[chat_id] == 0:
+                del self.holders[chat_id]
+                del self.locks[chat_id]
+
 
 class BotBuilder:
     def __init__(self):
         self.feature_list = []
         self.commands = set()
+        self.command_map: dict[str, IFeature] = {}
+        self.event_map: dict[str, IFeature] = {}
+        self.fallback_features: list[IFeature] = []
+        self.dispatcher: ChatDispatcher | None = None
+        self.executor: ThreadPoolExecutor | None = None
+        self.outbound: OutboundDispatcher | None = None
+        self.send_message: Callable[[int, str, dict], None] | None = None
+        self.bot_username: str | None = None
+        self.metrics = tgmetrics.metrics
+        self.metrics_port: int | None = None
+        self.boot_started = time.perf_counter()
         self.start = None
 
+    def candidates(self, feature_map: dict[str, IFeature], key: str | None) -> list[IFeature]:
+        if key in feature_map:
+            owner = feature_map[key]
+            return [owner] + [feature for feature in self.fallback_features if feature is not owner]
+        return self.fallback_features
+
+    def feature_labels(self, feature: IFeature, kind: str, key: str | None) -> dict[str, str]:
+        return {'feature': feature.feature_name(), 'kind': kind, 'key': str(key)}
+
+    def record_feature_call(self, labels: dict[str, str], started: float, error: Exception | None):
+        self.metrics.inc('feature_requests_total', labels)
+        if error is not None:
+            self.metrics.inc('feature_errors_total', labels)
+            print(f'{labels["feature"]} 处理{"命令" if labels["kind"] == "command" else "事件"} {labels["key"]} 异常：{error}')
+        self.metrics.observe('feature_latency_seconds', labels, time.perf_counter() - started)
+
+    def call_feature(self, feature: IFeature, handler_name: str, model, kind: str, key: str | None):
+        labels = self.feature_labels(feature, kind, key)
+        started = time.perf_counter()
+        try:
+            feature_response = getattr(feature.resolve(), handler_name)(model)
+        except Exception as e:
+            self.record_feature_call(labels, started, e)
+            return None
+        self.record_feature_call(labels, started, None)
+        return feature_response
+
+    def addressed_elsewhere(self, model) -> bool:
+        bot_name = command_context(model).bot_name
+        return bot_name is not None and self.bot_username is not None and \
+            bot_name.lower() != self.bot_username.lower()
+
     def route_command(self, model) -> MsgReply | str | None:
-        for feature in self.feature_list:
-            try:
-                feature_response = feature.handle_command(model)
-                if feature_response is not None:
-                    return feature_response
-            except:
-                continue
+        if self.addressed_elsewhere(model):
+            return None
+        command = extract_command(model)
+        for feature in self.candidates(self.command_map, command):
+            feature_response = self.call_feature(feature, 'handle_command', model, 'command', command)
+            if feature_response is not None:
+                return feature_response
 
         return None
 
     def route_event(self, call) -> MsgReply | str | None:
-        for feature in self.feature_list:
-            try:
-                feature_response = feature.handle_event(call)
-                if feature_response is not None:
-                    return feature_response
-            except:
-                continue
+        event = extract_event(call)
+        for feature in self.candidates(self.event_map, event):
+            feature_response = self.call_feature(feature, 'handle_event', call, 'event', event)
+            if feature_response is not None:
+                return feature_response
+
+        return None
+
+    async def call_feature_async(self, feature: IFeature, handler_name: str, model, kind: str, key: str | None):
+        labels = self.feature_labels(feature, kind, key)
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            if isinstance(feature, LazyFeature) and not feature.loaded:
+                await loop.run_in_executor(self.executor, feature.resolve)
+            handler = getattr(feature.resolve(), handler_name)
+            if inspect.iscoroutinefunction(handler):
+                feature_response = await handler(model)
+            else:
+                feature_response = await loop.run_in_executor(self.executor, handler, model)
+        except Exception as e:
+            self.record_feature_call(labels, started, e)
+            return None
+        self.record_feature_call(labels, started, None)
+        return feature_response
+
+    async def route_command_async(self, model) -> MsgReply | str | None:
+        if self.addressed_elsewhere(model):
+            return None
+        command = extract_command(model)
+        for feature in self.candidates(self.command_map, command):
+            feature_response = await self.call_feature_async(feature, 'handle_command', model, 'command', command)
+            if feature_response is not None:
+                return feature_response
+
+        return None
+
+    async def route_event_async(self, call) -> MsgReply | str | None:
+        event = extract_event(call)
+        for feature in self.candidates(self.event_map, event):
+            feature_response = await self.call_feature_async(feature, 'handle_event', call, 'event', event)
+            if feature_response is not None:
+                return feature_response
 
         return None
 
     def use(self, feature: IFeature):
         self.feature_list.append(feature)
         for cmd in feature.register_commands():
+            if cmd in self.command_map:
+                raise Exception(
+                    f'Command "{cmd}" has been registered by {self.command_map[cmd].__class__.__name__}'
+                )
             self.commands.add(cmd)
+            self.command_map[cmd] = feature
+        for event in feature.register_events():
+            if event in self.event_map:
+                raise Exception(
+                    f'Event "{event}" has been registered by {self.event_map[event].__class__.__name__}'
+                )
+            self.event_map[event] = feature
+        if feature.catch_all():
+            self.fallback_features.append(feature)
         return self
 
-    def telegram(self, token: str):
-        bot = telebot.TeleBot(token)
+    def send_reply(self, msg_model, send: Callable[[], None]):
+        if self.outbound is None:
+            send()
+        else:
+            self.outbound.reply(msg_model.chat.id, send)
+
+    def send_edit(self, call, content: tuple, send: Callable[[], None]):
+        if self.outbound is None:
+            if edit_changed(call, content):
+                send()
+        else:
+            self.outbound.edit(
+                call.message.chat.id,
+                call.message.message_id,
+                content,
+                send,
+                current=message_signature(call.message)
+            )
 
-        @bot.message_handler(commands=list(self.commands))
-        def handle_command(msg_model):
+    def push(self, chat_id: int, response: MsgReply | str):
+        if self.send_message is None:
+            print(f'机器人未启动，丢弃发往会话 {chat_id} 的推送')
+            return
+        text, options = reply_content(response)
+        if self.outbound is None:
+            try:
+                self.send_message(chat_id, text, options)
+            except Exception as e:
+                print(f'会话 {chat_id} 推送消息失败：{e}')
+        else:
+            self.outbound.reply(chat_id, lambda: self.send_message(chat_id, text, options))
+
+    def telegram(
+            self,
+            token: str,
+            workers: int | None = None,
+            webhook: WebhookConfig | None = None,
+            outbound: OutboundDispatcher | None = None
+    ):
+        for feature in self.feature_list:
+            if is_async_feature(feature):
+                raise Exception(f'{feature.feature_name()} requires the asyncio runtime')
+
+        if workers is None:
+            bot = telebot.TeleBot(token)
+        else:
+            bot = telebot.TeleBot(token, threaded=False)
+            self.dispatcher = ChatDispatcher(workers)
+
+        self.outbound = outbound
+        self.send_message = lambda chat_id, text, options: bot.send_message(chat_id, text, **options)
+        try:
+            self.bot_username = bot.get_me().username
+        except Exception as e:
+            print(f'获取机器人用户名失败，将响应所有 @ 命令：{e}')
+
+        def reply_command(msg_model):
             response = self.route_command(msg_model)
             if response is not None:
-                if isinstance(response, str):
-                    bot.reply_to(msg_model, response)
-                elif response.empty_event():
-                    bot.reply_to(msg_model, response.msg)
-                else:
-                    bot.reply_to(msg_model, response.msg, reply_markup=response.reply_markup())
+                text, options = reply_content(response)
+                self.send_reply(msg_model, lambda: bot.reply_to(msg_model, text, **options))
+
+        def reply_event(call):
+            response = self.route_event(call)
+            if response is not None:
+                text, options = reply_content(response)
+                self.send_edit(
+                    call,
+                    content_signature(text, options),
+                    lambda: bot.edit_message_text(text, call.message.chat.id, call.message.message_id, **options)
+                )
+
+        @bot.message_handler(commands=list(self.commands))
+        def handle_command(msg_model):
+            if self.dispatcher is None:
+                reply_command(msg_model)
+            else:
+                self.dispatcher.submit(msg_model.chat.id, lambda: reply_command(msg_model))
 
         @bot.callback_query_handler(func=lambda callback: True)
         def handle_event(call):
-            response = self.route_event(call)
+            if self.dispatcher is None:
+                reply_event(call)
+            else:
+                self.dispatcher.submit(call.message.chat.id, lambda: reply_event(call))
+
+        if webhook is None:
+            self.start = lambda: bot.infinity_polling()
+        else:
+            def serve_webhook():
+                server = WebhookServer(webhook, lambda update: bot.process_new_updates([update]))
+                if webhook.url is not None:
+                    bot.remove_webhook()
+                    bot.set_webhook(url=webhook.url, secret_token=webhook.secret_token)
+                try:
+                    server.serve_forever()
+                finally:
+                    server.shutdown()
+
+            self.start = serve_webhook
+        return self
+
+    def telegram_async(
+            self,
+            token: str,
+            workers: int | None = None,
+            webhook: WebhookConfig | None = None,
+            outbound: OutboundDispatcher | None = None
+    ):
+        from telebot.async_telebot import AsyncTeleBot
+
+        bot = AsyncTeleBot(token)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='feature-worker')
+        chat_locks = AsyncChatLocks()
+        self.outbound = outbound
+        running_loop: list[asyncio.AbstractEventLoop] = []
+        self.send_message = lambda chat_id, text, options: asyncio.run_coroutine_threadsafe(
+            bot.send_message(chat_id, text, **options),
+            running_loop[0]
+        ).result()
+
+        async def fetch_username():
+            try:
+                self.bot_username = (await bot.get_me()).username
+            except Exception as e:
+                print(f'获取机器人用户名失败，将响应所有 @ 命令：{e}')
+
+        async def serve_polling():
+            running_loop.append(asyncio.get_running_loop())
+            await fetch_username()
+            await bot.infinity_polling()
+
+        async def reply_command(msg_model):
+            response = await self.route_command_async(msg_model)
             if response is not None:
-                if isinstance(response, str):
-                    bot.edit_message_text(response, call.message.chat.id, call.message.message_id)
-                elif response.empty_event():
-                    bot.edit_message_text(response.msg, call.message.chat.id, call.message.message_id)
+                text, options = reply_content(response)
+                if self.outbound is None:
+                    await bot.reply_to(msg_model, text, **options)
                 else:
-                    bot.edit_message_text(
-                        response.msg,
-                        call.message.chat.id,
-                        call.message.message_id,
-                        reply_markup=response.reply_markup()
+                    loop = asyncio.get_running_loop()
+                    self.send_reply(
+                        msg_model,
+                        lambda: asyncio.run_coroutine_threadsafe(bot.reply_to(msg_model, text, **options), loop).result()
                     )
 
-        self.start = lambda: bot.infinity_polling()
+        async def reply_event(call):
+            response = await self.route_event_async(call)
+            if response is not None:
+                text, options = reply_content(response)
+                if self.outbound is None:
+                    if edit_changed(call, content_signature(text, options)):
+                        await bot.edit_message_text(text, call.message.chat.id, call.message.message_id, **options)
+                else:
+                    loop = asyncio.get_running_loop()
+                    self.send_edit(
+                        call,
+                        content_signature(text, options),
+                        lambda: asyncio.run_coroutine_threadsafe(
+                            bot.edit_message_text(text, call.message.chat.id, call.message.message_id, **options),
+                            loop
+                        ).result()
+                    )
+
+        @bot.message_handler(commands=list(self.commands))
+        async def handle_command(msg_model):
+            await chat_locks.run(msg_model.chat.id, lambda: reply_command(msg_model))
+
+        @bot.callback_query_handler(func=lambda callback: True)
+        async def handle_event(call):
+            await chat_locks.run(call.message.chat.id, lambda: reply_event(call))
+
+        if webhook is None:
+            self.start = lambda: asyncio.run(serve_polling())
+        else:
+            async def serve_webhook():
+                loop = asyncio.get_running_loop()
+                running_loop.append(loop)
+                await fetch_username()
+                server = WebhookServer(
+                    webhook,
+                    lambda update: asyncio.run_coroutine_threadsafe(bot.process_new_updates([update]), loop)
+                )
+                if webhook.url is not None:
+                    await bot.remove_webhook()
+                    await bot.set_webhook(url=webhook.url, secret_token=webhook.secret_token)
+                server.start()
+                try:
+                    await asyncio.Event().wait()
+                finally:
+                    server.shutdown()
+
+            self.start = lambda: asyncio.run(serve_webhook())
         return self
 
     def run(self):
         if self.start is None:
             raise Exception('Robot Not Loaded')
+        print_startup_report(self.boot_started)
         print('\n* 启动机器人服务器 *')
-        self.start()
+        metrics_server = None
+        if self.metrics_port is not None:
+            metrics_server = self.metrics.serve(port=self.metrics_port)
+        if hasattr(signal, 'SIGUSR1') and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGUSR1, lambda signum, frame: print(self.metrics.render()))
+        for feature in self.feature_list:
+            feature.bind_push(self.push)
+            if isinstance(feature, LazyFeature) and feature.preload:
+                threading.Thread(target=feature.resolve, name=f'preload-{feature.name}', daemon=True).start()
+        try:
+            self.start()
+        finally:
+            if metrics_server is not None:
+                metrics_server.shutdown()
+            if self.dispatcher is not None:
+                self.dispatcher.shutdown(wait=True)
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+            if self.outbound is not None:
+                self.outbound.shutdown()
+            for feature in self.feature_list:
+                feature.close()
 
 
 def build_bot(features: list[IFeature], bot_meta: dict):
@@ -151,9 +744,41 @@ def build_bot(features: list[IFeature], bot_meta: dict):
     for feature in features:
         res.use(feature)
 
+    if bot_meta.get('boot_started') is not None:
+        res.boot_started = bot_meta['boot_started']
+
+    if bot_meta.get('metrics_port') is not None:
+        res.metrics_port = int(bot_meta['metrics_port'])
+
     if 'type' in bot_meta:
         match bot_meta['type']:
             case 'telegram':
-                res.telegram(bot_meta['token'])
+                match bot_meta.get('mode', 'polling'):
+                    case 'polling':
+                        webhook = None
+                    case 'webhook':
+                        webhook = WebhookConfig.from_meta(bot_meta)
+                    case mode:
+                        raise Exception(f'Unknown mode: {mode}')
+                outbound = None
+                if bot_meta.get('outbound'):
+                    outbound = OutboundDispatcher.from_meta(bot_meta['outbound'])
+                match bot_meta.get('runtime', 'thread'):
+                    case 'thread':
+                        res.telegram(
+                            bot_meta['token'],
+                            workers=bot_meta.get('workers'),
+                            webhook=webhook,
+                            outbound=outbound
+                        )
+                    case 'asyncio':
+                        res.telegram_async(
+                            bot_meta['token'],
+                            workers=bot_meta.get('workers'),
+                            webhook=webhook,
+                            outbound=outbound
+                        )
+                    case runtime:
+                        raise Exception(f'Unknown runtime: {runtime}')
 
     return res
@@ -0,0 +1,120 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def format_labels(labels: tuple[tuple[str, str], ...], extra: tuple[tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if len(pairs) == 0:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    ) + '}'
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self, prefix: str = 'sakulin', buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counters: dict[str, dict[tuple, float]] = {}
+        self.histograms: dict[str, dict[tuple, Histogram]] = {}
+
+    def inc(self, name: str, labels: dict[str, str], value: float = 1):
+        key = tuple(labels.items())
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, labels: dict[str, str], value: float):
+        key = tuple(labels.items())
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(self.buckets)
+            series[key].observe(value)
+
+    def render(self) -> str:
+        lines = []
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                full_name = f'{self.prefix}_{name}'
+                lines.append(f'# TYPE {full_name} counter')
+                for labels, value in series.items():
+                    lines.append(f'{full_name}{format_labels(labels)} {value}')
+            for name, series in sorted(self.histograms.items()):
+                full_name = f'{self.prefix}_{name}'
+                lines.append(f'# TYPE {full_name} histogram')
+                for labels, histogram in series.items():
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'{full_name}_bucket{format_labels(labels, (("le", bound),))} {count}')
+                    lines.append(f'{full_name}_bucket{format_labels(labels, (("le", "+Inf"),))} {histogram.count}')
+                    lines.append(f'{full_name}_sum{format_labels(labels)} {histogram.sum}')
+                    lines.append(f'{full_name}_count{format_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, host: str = '0.0.0.0', port: int = 9464):
+        return MetricsServer(self, host, port).start()
+
+
+class MetricsServer:
+    def __init__(self, registry: Metrics, host: str, port: int):
+        self.registry = registry
+        self.httpd = ThreadingHTTPServer((host, port), self.handler_class())
+        self.thread: threading.Thread | None = None
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def handler_class(self):
+        server = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = server.registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return MetricsHandler
+
+    def start(self):
+        print(f'指标服务器监听 {self.httpd.server_address[0]}:{self.port}/metrics')
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='metrics-server', daemon=True)
+        self.thread.start()
+        return self
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+metrics = Metrics()
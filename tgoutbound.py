@@ -0,0 +1,201 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable
+
+import telebot
+
+from utils import ChatDispatcher
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def delay(self, now: float) -> float:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class OutboundJob:
+    def __init__(
+            self,
+            chat_id: int,
+            send: Callable[[], None],
+            edit_key: tuple[int, int] | None = None,
+            content: tuple | None = None
+    ):
+        self.chat_id = chat_id
+        self.send = send
+        self.edit_key = edit_key
+        self.content = content
+
+
+class OutboundDispatcher:
+    def __init__(
+            self,
+            global_rate: float = 30,
+            chat_rate: float = 1,
+            chat_burst: float = 3,
+            group_rate: float = 20 / 60,
+            group_burst: float = 3,
+            max_tracked_messages: int = 4096,
+            max_tracked_chats: int = 4096,
+            send_workers: int = 4
+    ):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.max_tracked_messages = max_tracked_messages
+        self.max_tracked_chats = max_tracked_chats
+        self.chat_buckets: OrderedDict[int, TokenBucket] = OrderedDict()
+        self.queues: OrderedDict[int, deque[OutboundJob]] = OrderedDict()
+        self.pending_edits: dict[tuple[int, int], OutboundJob] = {}
+        self.sent_contents: OrderedDict[tuple[int, int], tuple] = OrderedDict()
+        self.paused_until = 0
+        self.condition = threading.Condition()
+        self.running = True
+        self.senders = ChatDispatcher(send_workers, thread_name_prefix='outbound-sender')
+        self.thread = threading.Thread(target=self.work, name='outbound-dispatcher', daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def from_meta(outbound_meta: dict | bool):
+        if outbound_meta is True:
+            return OutboundDispatcher()
+        return OutboundDispatcher(**outbound_meta)
+
+    def chat_bucket(self, chat_id: int) -> TokenBucket:
+        if chat_id not in self.chat_buckets:
+            if chat_id < 0:
+                self.chat_buckets[chat_id] = TokenBucket(self.group_rate, self.group_burst)
+            else:
+                self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            self.evict_buckets()
+        self.chat_buckets.move_to_end(chat_id)
+        return self.chat_buckets[chat_id]
+
+    def evict_buckets(self):
+        for chat_id in list(self.chat_buckets.keys()):
+            if len(self.chat_buckets) <= self.max_tracked_chats:
+                return
+            if chat_id not in self.queues:
+                del self.chat_buckets[chat_id]
+
+    def enqueue(self, job: OutboundJob):
+        if job.chat_id not in self.queues:
+            self.queues[job.chat_id] = deque()
+        self.queues[job.chat_id].append(job)
+        self.condition.notify()
+
+    def reply(self, chat_id: int, send: Callable[[], None]):
+        with self.condition:
+            self.enqueue(OutboundJob(chat_id, send))
+
+    def edit(self, chat_id: int, message_id: int, content: tuple, send: Callable[[], None], current: tuple | None = None):
+        key = (chat_id, message_id)
+        with self.condition:
+            if key in self.pending_edits:
+                job = self.pending_edits[key]
+                job.send = send
+                job.content = content
+                return
+            if self.sent_contents.get(key, current) == content:
+                return
+            job = OutboundJob(chat_id, send, key, content)
+            self.pending_edits[key] = job
+            self.enqueue(job)
+
+    def next_job(self) -> tuple[OutboundJob | None, float | None]:
+        now = time.monotonic()
+        if now < self.paused_until:
+            return None, self.paused_until - now
+        if len(self.queues) == 0:
+            return None, None
+        global_delay = self.global_bucket.delay(now)
+        if global_delay > 0:
+            return None, global_delay
+        wait = None
+        for chat_id, jobs in self.queues.items():
+            bucket = self.chat_bucket(chat_id)
+            chat_delay = bucket.delay(now)
+            if chat_delay > 0:
+                wait = chat_delay if wait is None else min(wait, chat_delay)
+                continue
+            job = jobs.popleft()
+            if len(jobs) == 0:
+                del self.queues[chat_id]
+            else:
+                self.queues.move_to_end(chat_id)
+            if job.edit_key is not None:
+                del self.pending_edits[job.edit_key]
+                if self.sent_contents.get(job.edit_key) == job.content:
+                    return None, 0
+            bucket.take()
+            self.global_bucket.take()
+            return job, None
+        return None, wait
+
+    def record_sent(self, job: OutboundJob):
+        if job.edit_key is None:
+            return
+        with self.condition:
+            self.sent_contents[job.edit_key] = job.content
+            self.sent_contents.move_to_end(job.edit_key)
+            while len(self.sent_contents) > self.max_tracked_messages:
+                self.sent_contents.popitem(last=False)
+
+    def retry_later(self, job: OutboundJob, retry_after: float):
+        with self.condition:
+            self.paused_until = time.monotonic() + retry_after
+            if job.edit_key is not None:
+                if job.edit_key in self.pending_edits:
+                    return
+                self.pending_edits[job.edit_key] = job
+            if job.chat_id not in self.queues:
+                self.queues[job.chat_id] = deque()
+            self.queues[job.chat_id].appendleft(job)
+            self.condition.notify()
+
+    def work(self):
+        while True:
+            with self.condition:
+                if not self.running:
+                    return
+                job, wait = self.next_job()
+                if job is None:
+                    if wait != 0:
+                        self.condition.wait(wait)
+                    continue
+            self.senders.submit(job.chat_id, lambda sent_job=job: self.deliver(sent_job))
+
+    def deliver(self, job: OutboundJob):
+        try:
+            job.send()
+            self.record_sent(job)
+        except telebot.apihelper.ApiTelegramException as e:
+            if e.error_code == 429:
+                self.retry_later(job, e.result_json.get('parameters', {}).get('retry_after', 1))
+            elif 'message is not modified' in e.description:
+                self.record_sent(job)
+            else:
+                print(f'会话 {job.chat_id} 发送消息失败：{e}')
+        except Exception as e:
+            print(f'会话 {job.chat_id} 发送消息失败：{e}')
+
+    def shutdown(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.senders.shutdown()
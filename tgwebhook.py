@@ -0,0 +1,98 @@
+import hmac
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+import telebot
+
+
+class WebhookConfig:
+    def __init__(
+            self,
+            url: str | None = None,
+            host: str = '0.0.0.0',
+            port: int = 8443,
+            path: str = '/',
+            secret_token: str | None = None
+    ):
+        self.url = url
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+
+    @staticmethod
+    def from_meta(bot_meta: dict):
+        if not bot_meta.get('secret_token'):
+            raise Exception('Webhook mode requires a secret_token')
+        return WebhookConfig(
+            url=bot_meta.get('webhook_url'),
+            host=bot_meta.get('webhook_host', '0.0.0.0'),
+            port=int(bot_meta.get('webhook_port', 8443)),
+            path=bot_meta.get('webhook_path', '/'),
+            secret_token=bot_meta.get('secret_token')
+        )
+
+
+class WebhookServer:
+    def __init__(self, config: WebhookConfig, on_update: Callable[[telebot.types.Update], None]):
+        if not config.secret_token:
+            raise Exception('Webhook server requires a secret_token')
+        self.config = config
+        self.on_update = on_update
+        self.httpd = ThreadingHTTPServer((config.host, config.port), self.handler_class())
+        self.thread: threading.Thread | None = None
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def handler_class(self):
+        server = self
+
+        class WebhookHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != server.config.path:
+                    self.reply(404)
+                    return
+                if not server.check_secret(self.headers.get('X-Telegram-Bot-Api-Secret-Token')):
+                    self.reply(403)
+                    return
+                try:
+                    body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                    update = telebot.types.Update.de_json(body.decode('utf-8'))
+                except Exception as e:
+                    print(f'Webhook 更新解析失败：{e}')
+                    self.reply(400)
+                    return
+                self.reply(200)
+                server.on_update(update)
+
+            def reply(self, status: int):
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        return WebhookHandler
+
+    def check_secret(self, token: str | None) -> bool:
+        if token is None:
+            return False
+        return hmac.compare_digest(token.encode('utf-8'), self.config.secret_token.encode('utf-8'))
+
+    def serve_forever(self):
+        print(f'Webhook 服务器监听 {self.config.host}:{self.port}{self.config.path}')
+        self.httpd.serve_forever()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name='webhook-server', daemon=True)
+        self.thread.start()
+        return self
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -1,6 +1,12 @@
 import os.path
 import re
 import sqlite3
+import threading
+import time
+from abc import abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from typing import Callable
 
 
@@ -8,90 +14,473 @@ def is_valid_string(s):
     return bool(re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', s))
 
 
+class IStorageBackend:
+    single_connection = False
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        return False
+
+    @abstractmethod
+    def connect(self, key: str, check_same_thread: bool = True) -> sqlite3.Connection:
+        pass
+
+    def release(self, key: str):
+        pass
+
+
+class SQLiteStorageBackend(IStorageBackend):
+
+    def __init__(self, directory: str = 'save'):
+        if os.path.isfile(directory):
+            raise Exception(f'The filename "{directory}" has been occupied by a file!')
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.directory = directory
+
+    def filepath(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.sqlite3')
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.filepath(key))
+
+    def connect(self, key: str, check_same_thread: bool = True) -> sqlite3.Connection:
+        return sqlite3.connect(self.filepath(key), check_same_thread=check_same_thread, cached_statements=256)
+
+
+class MemoryStorageBackend(IStorageBackend):
+    single_connection = True
+
+    def __init__(self):
+        self.connections: dict[str, sqlite3.Connection] = {}
+        self.lock = threading.Lock()
+
+    def exists(self, key: str) -> bool:
+        return key in self.connections
+
+    def connect(self, key: str, check_same_thread: bool = True) -> sqlite3.Connection:
+        with self.lock:
+            if key not in self.connections:
+                self.connections[key] = sqlite3.connect(':memory:', check_same_thread=False, cached_statements=256)
+            return self.connections[key]
+
+    def release(self, key: str):
+        with self.lock:
+            if key in self.connections:
+                self.connections.pop(key).close()
+
+
 class StorageDataEntrance:
 
-    def __init__(self, key: str, init_sql_path: str):
+    def __init__(
+            self,
+            key: str,
+            init_sql_path: str,
+            pooled: bool = False,
+            cache_size_kib: int = 8192,
+            migrations_dir: str | None = None,
+            write_behind: bool = False,
+            flush_interval: float = 0.05,
+            max_batch: int = 256,
+            backend: IStorageBackend | None = None
+    ):
         if not is_valid_string(key):
             raise Exception(f'Invalid key name: {key}')
-        if os.path.isfile('save'):
-            raise Exception('The filename "save" in relative path has been occupied by a file!')
-        if not os.path.isdir('save'):
-            os.mkdir('save')
-        self.target_filepath = f"save/{key}.sqlite3"
-        if not os.path.exists(self.target_filepath):
+        self.key = key
+        self.backend = SQLiteStorageBackend() if backend is None else backend
+        self.pooled = pooled
+        self.cache_size_kib = cache_size_kib
+        self.local = threading.local()
+        self.connections: list[sqlite3.Connection] = []
+        self.connections_lock = threading.Lock()
+        self.generation = 0
+        self.single_lock = threading.RLock()
+        if not self.backend.exists(key):
             self.first_create = True
             with open(init_sql_path, 'r') as init_sql_file:
                 try:
-                    conn = sqlite3.connect(self.target_filepath)
-                    conn.cursor().executescript(init_sql_file.read())
+                    with self.connection() as conn:
+                        conn.executescript(init_sql_file.read())
                 except sqlite3.Error as e:
                     print('Failed to init sql script:', e)
-                finally:
-                    conn.close()
         else:
             self.first_create = False
+        if migrations_dir is not None:
+            self.migrate(migrations_dir)
+
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.write_condition = threading.Condition()
+        self.pending_writes: deque[tuple[int, str, tuple | list, str]] = deque()
+        self.enqueued_seq = 0
+        self.committed_seq = 0
+        self.flush_requested = False
+        self.writer: threading.Thread | None = None
+        if write_behind:
+            self.writer = threading.Thread(target=self.write_loop, name=f'{key}-writer', daemon=True)
+            self.writer.start()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = self.backend.connect(self.key, check_same_thread=not self.pooled)
+        if self.pooled and not self.backend.single_connection:
+            conn.execute('pragma journal_mode = wal')
+            conn.execute('pragma synchronous = normal')
+            conn.execute(f'pragma cache_size = -{self.cache_size_kib}')
+            conn.execute('pragma temp_store = memory')
+            conn.execute('pragma busy_timeout = 5000')
+        return conn
 
-    def select(self, from_table: str, condition: str | None = None):
-        sql = f'select * from {from_table}' + f' where {condition}' if isinstance(condition, str) else ''
-        res = conn = None
+    @contextmanager
+    def connection(self):
+        if self.backend.single_connection:
+            with self.single_lock:
+                yield self.backend.connect(self.key)
+            return
+
+        if not self.pooled:
+            conn = self.connect()
+            try:
+                yield conn
+            finally:
+                conn.close()
+            return
+
+        conn = getattr(self.local, 'connection', None)
+        if conn is None or getattr(self.local, 'generation', None) != self.generation:
+            conn = self.connect()
+            with self.connections_lock:
+                self.connections.append(conn)
+                self.local.connection = conn
+                self.local.generation = self.generation
+        yield conn
+
+    def write_loop(self):
+        while True:
+            with self.write_condition:
+                while len(self.pending_writes) == 0 and self.writer is not None:
+                    self.write_condition.wait(self.flush_interval)
+                if len(self.pending_writes) == 0:
+                    break
+                deadline = time.monotonic() + self.flush_interval
+                while len(self.pending_writes) < self.max_batch and not self.flush_requested and self.writer is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.write_condition.wait(remaining)
+                batch = list(self.pending_writes)
+                self.pending_writes.clear()
+                self.flush_requested = False
+            try:
+                with self.connection() as conn:
+                    self.commit_batch(conn, batch)
+            except sqlite3.Error as e:
+                print('Failed to commit batch!')
+                print(e)
+            with self.write_condition:
+                self.committed_seq = batch[-1][0]
+                self.write_condition.notify_all()
+
+    def commit_batch(self, conn: sqlite3.Connection, batch: list[tuple[int, str, tuple | list, str]]):
         try:
-            conn = sqlite3.connect(self.target_filepath)
-            res = conn.cursor().execute(sql).fetchall()
+            with conn:
+                for _, sql, params, _ in batch:
+                    conn.execute(sql, params)
+            return
+        except sqlite3.Error:
+            pass
+        for _, sql, params, action in batch:
+            try:
+                with conn:
+                    conn.execute(sql, params)
+            except sqlite3.Error as e:
+                print(f'Failed to {action}:', sql)
+                print(e)
+
+    def wait_for_writes(self, seq: int):
+        if not self.write_behind or seq <= self.committed_seq:
+            return
+        with self.write_condition:
+            self.flush_requested = True
+            self.write_condition.notify_all()
+            while self.committed_seq < seq:
+                self.write_condition.wait()
+
+    def flush(self):
+        self.wait_for_writes(self.enqueued_seq)
+
+    def close(self):
+        if self.writer is not None:
+            writer = self.writer
+            with self.write_condition:
+                self.writer = None
+                self.write_condition.notify_all()
+            writer.join()
+        with self.connections_lock:
+            self.generation += 1
+            for conn in self.connections:
+                try:
+                    conn.close()
+                except sqlite3.Error as e:
+                    print('Failed to close connection:', e)
+            self.connections.clear()
+        self.backend.release(self.key)
+
+    def migrate(self, migrations_dir: str):
+        migrations = []
+        for filename in os.listdir(migrations_dir):
+            matched = re.match(r'^(\d+)_([a-zA-Z0-9_]+)\.sql$', filename)
+            if matched:
+                migrations.append((int(matched.group(1)), filename, os.path.join(migrations_dir, filename)))
+        migrations.sort()
+
+        with self.connection() as conn:
+            conn.executescript(
+                'create table if not exists schema_version ('
+                'version integer not null primary key, '
+                'name text not null, '
+                'applied_at text not null default current_timestamp)'
+            )
+            current_version = conn.execute('select coalesce(max(version), 0) from schema_version').fetchone()[0]
+            for version, name, path in migrations:
+                if version <= current_version:
+                    continue
+                print(f'应用数据库迁移 {name}')
+                with open(path, 'r') as migration_file:
+                    migration_sql = migration_file.read()
+                try:
+                    conn.executescript(
+                        f'begin;\n{migration_sql}\n;\n'
+                        f"insert into schema_version (version, name) values ({version}, '{name}');\n"
+                        'commit;'
+                    )
+                except sqlite3.Error as e:
+                    conn.rollback()
+                    raise Exception(f'Failed to apply migration {name}: {e}')
+
+    def select(self, from_table: str, condition: str | None = None, params: tuple | list = ()):
+        sql = f'select * from {from_table}' + (f' where {condition}' if isinstance(condition, str) else '')
+        res = None
+        self.wait_for_writes(getattr(self.local, 'last_write', 0))
+        try:
+            with self.connection() as conn:
+                res = conn.execute(sql, params).fetchall()
         except sqlite3.Error as e:
             print('Failed to select:', sql)
             print(e)
-        finally:
-            conn.close()
         return res
 
-    def insert(self, into_table: str, value: dict[str, str]):
-        sql = f'insert into {into_table} (' + ', '.join(value.keys()) + ') values (' + ', '.join(value.values()) + ')'
-        conn = None
+    def write(self, sql: str, params: tuple | list, action: str, sync: bool = False) -> int | None:
+        if self.write_behind and not sync:
+            with self.write_condition:
+                if self.writer is not None:
+                    self.enqueued_seq += 1
+                    self.pending_writes.append((self.enqueued_seq, sql, params, action))
+                    self.local.last_write = self.enqueued_seq
+                    self.write_condition.notify_all()
+                    return None
+        if self.write_behind:
+            self.flush()
         try:
-            conn = sqlite3.connect(self.target_filepath)
-            conn.cursor().execute(sql)
-            conn.commit()
+            with self.connection() as conn:
+                with conn:
+                    return conn.execute(sql, params).rowcount
         except sqlite3.Error as e:
-            print('Failed to insert:', sql)
+            print(f'Failed to {action}:', sql)
             print(e)
-        finally:
-            conn.close()
+            return 0
 
-    def remove(self, from_table: str, condition: str):
+    def insert(self, into_table: str, value: dict[str, str], params: tuple | list = ()):
+        sql = f'insert into {into_table} (' + ', '.join(value.keys()) + ') values (' + ', '.join(value.values()) + ')'
+        self.write(sql, params, 'insert')
+
+    def remove(self, from_table: str, condition: str, params: tuple | list = ()):
         sql = f'delete from {from_table} where {condition}'
-        conn = None
-        try:
-            conn = sqlite3.connect(self.target_filepath)
-            conn.cursor().execute(sql)
-            conn.commit()
-        except sqlite3.Error as e:
-            print('Failed to remove:', sql)
-            print(e)
-        finally:
-            conn.close()
+        self.write(sql, params, 'remove')
 
-    def update(self, table: str, set_value: dict[str, str], condition: str):
+    def update(
+            self,
+            table: str,
+            set_value: dict[str, str],
+            condition: str,
+            params: tuple | list = (),
+            sync: bool = False
+    ) -> int | None:
         sql = f'update {table} set ' + ', '.join(
             f'{key} = {value}' for key, value in set_value.items()) + f' where {condition}'
-        conn = None
-        try:
-            conn = sqlite3.connect(self.target_filepath)
-            conn.cursor().execute(sql)
-            conn.commit()
-        except sqlite3.Error as e:
-            print('Failed to update:', sql)
-            print(e)
-        finally:
-            conn.close()
+        return self.write(sql, params, 'update', sync)
 
     def execute(self, fun: Callable[[sqlite3.Cursor], None]):
-        conn = None
+        self.flush()
         try:
-            conn = sqlite3.connect(self.target_filepath)
-            fun(conn.cursor())
-            conn.commit()
+            with self.connection() as conn:
+                with conn:
+                    fun(conn.cursor())
         except sqlite3.Error as e:
             print('Failed to execute!')
             print(e)
+
+
+class CacheEntry:
+    def __init__(self, value, fresh_until: float, stale_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class TTLCache:
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self.entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> CacheEntry | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry.stale_until <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, value, ttl: float, stale_ttl: float = 0):
+        now = time.monotonic()
+        with self.lock:
+            self.entries[key] = CacheEntry(value, now + ttl, now + ttl + stale_ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key: str):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class FlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls: dict[str, FlightCall] = {}
+
+    def do(self, key: str, fun: Callable[[], object]) -> tuple[object, bool]:
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = FlightCall()
+                self.calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fun()
+        except BaseException as e:
+            call.error = e
+            raise
         finally:
-            conn.close()
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, backoff: float = 1, max_backoff: float = 60):
+        self.failure_threshold = failure_threshold
+        self.base_backoff = backoff
+        self.max_backoff = max_backoff
+        self.lock = threading.Lock()
+        self.state = CircuitBreaker.CLOSED
+        self.failures = 0
+        self.backoff = backoff
+        self.retry_at = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != CircuitBreaker.CLOSED
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.state == CircuitBreaker.CLOSED:
+                return True
+            if self.state == CircuitBreaker.OPEN and time.monotonic() >= self.retry_at:
+                self.state = CircuitBreaker.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> bool:
+        with self.lock:
+            recovered = self.state != CircuitBreaker.CLOSED
+            self.state = CircuitBreaker.CLOSED
+            self.failures = 0
+            self.backoff = self.base_backoff
+            return recovered
+
+    def record_failure(self) -> float | None:
+        with self.lock:
+            self.failures += 1
+            if self.state == CircuitBreaker.HALF_OPEN:
+                self.backoff = min(self.max_backoff, self.backoff * 2)
+            elif self.state == CircuitBreaker.OPEN or self.failures < self.failure_threshold:
+                return None
+            self.state = CircuitBreaker.OPEN
+            self.retry_at = time.monotonic() + self.backoff
+            return self.backoff
+
+
+class ChatDispatcher:
+    def __init__(self, workers: int, thread_name_prefix: str = 'chat-worker'):
+        if workers < 1:
+            raise Exception(f'Invalid worker count: {workers}')
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=thread_name_prefix)
+        self.lock = threading.Condition()
+        self.pending: dict[int, deque[Callable[[], None]]] = {}
+
+    def submit(self, chat_id: int, task: Callable[[], None]):
+        with self.lock:
+            if chat_id in self.pending:
+                self.pending[chat_id].append(task)
+                return
+            self.pending[chat_id] = deque()
+        self.executor.submit(self.drain, chat_id, task)
+
+    def drain(self, chat_id: int, task: Callable[[], None]):
+        try:
+            task()
+        except Exception as e:
+            print(f'会话 {chat_id} 处理更新异常：{e}')
+        with self.lock:
+            tasks = self.pending[chat_id]
+            if len(tasks) == 0:
+                del self.pending[chat_id]
+                self.lock.notify_all()
+                return
+            next_task = tasks.popleft()
+        self.executor.submit(self.drain, chat_id, next_task)
+
+    def shutdown(self, wait: bool = False):
+        if wait:
+            with self.lock:
+                while len(self.pending) > 0:
+                    self.lock.wait()
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)